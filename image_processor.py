@@ -3,13 +3,33 @@
 处理图片导入、导出、格式转换、尺寸调整等功能
 """
 
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Set, Tuple, Optional, Dict, Any
 from PIL import Image, ImageOps
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+# PyTurboJPEG是可选加速依赖：libjpeg-turbo的SIMD编码器比Pillow自带的
+# libjpeg封装快2-4倍。按需探测一次，每个进程各持有一个编码器实例。
+_turbojpeg = None
+_turbojpeg_checked = False
+
+
+def _get_turbojpeg():
+    """返回TurboJPEG编码器实例，未安装PyTurboJPEG或初始化失败时返回None"""
+    global _turbojpeg, _turbojpeg_checked
+    if not _turbojpeg_checked:
+        _turbojpeg_checked = True
+        try:
+            from turbojpeg import TurboJPEG
+            _turbojpeg = TurboJPEG()
+        except Exception:
+            _turbojpeg = None
+    return _turbojpeg
+
 
 class ImageProcessor:
     """图片处理器"""
@@ -21,11 +41,25 @@ class ImageProcessor:
         'BMP': ['.bmp'],
         'TIFF': ['.tiff', '.tif']
     }
+
+    # 缩略图磁盘缓存目录（按文件路径+修改时间哈希命名）
+    THUMB_CACHE_DIR = Path('config') / 'thumbnails'
     
     def __init__(self):
         """初始化图片处理器"""
         self.images: List[Dict[str, Any]] = []
         self.current_image_index = 0
+        # 已解析的图片父目录集合（延迟构建，列表变化时失效）
+        self._resolved_parents: Optional[Set[Path]] = None
+        # 已添加图片的规范化路径集合，用于O(1)去重，避免重复解码同一文件
+        self._added_paths: Set[str] = set()
+        # 当前图片的单槽解码缓存：(文件路径, 解码后的图片)
+        self._current_image_cache: Optional[Tuple[str, Image.Image]] = None
+
+    @staticmethod
+    def _normalize_path(file_path: str) -> str:
+        """规范化路径用于去重比较（绝对路径+大小写折叠）"""
+        return os.path.normcase(os.path.abspath(file_path))
     
     def get_supported_extensions(self) -> List[str]:
         """获取所有支持的图片扩展名"""
@@ -77,27 +111,138 @@ class ImageProcessor:
         Returns:
             bool: 添加是否成功
         """
-        if not self.is_supported_image(file_path):
+        normalized = self._normalize_path(file_path)
+        if normalized in self._added_paths:
             return False
-        
-        image = self.load_image(file_path)
-        if image is None:
+
+        image_info = self._load_image_info(file_path)
+        if image_info is None:
             return False
-        
-        # 生成缩略图
-        thumbnail = self.create_thumbnail(image, (150, 150))
-        
-        image_info = {
+
+        self.images.append(image_info)
+        self._added_paths.add(normalized)
+        self._resolved_parents = None
+        return True
+
+    def add_images(self, file_paths: List[str]) -> int:
+        """
+        批量添加图片（并行加载和生成缩略图）
+
+        解码和缩略图生成在线程池中并行执行，结果按输入顺序追加。
+
+        Args:
+            file_paths: 图片文件路径列表
+
+        Returns:
+            int: 成功添加的图片数量
+        """
+        # 先按扩展名过滤，再对已添加过的和本批次内重复的路径去重，
+        # 重复文件连解码都不用做
+        supported = []
+        seen = set(self._added_paths)
+        for p in file_paths:
+            if not self.is_supported_image(p):
+                continue
+            normalized = self._normalize_path(p)
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            supported.append(p)
+        if not supported:
+            return 0
+
+        added_count = 0
+        max_workers = min(4, len(supported))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for file_path, image_info in zip(
+                    supported, executor.map(self._load_image_info, supported)):
+                if image_info is not None:
+                    self.images.append(image_info)
+                    self._added_paths.add(self._normalize_path(file_path))
+                    added_count += 1
+
+        if added_count > 0:
+            self._resolved_parents = None
+        return added_count
+
+    def _load_image_info(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        加载单张图片及其缩略图信息
+
+        Args:
+            file_path: 图片文件路径
+
+        Returns:
+            Dict: 图片信息字典，加载失败返回None
+        """
+        if not self.is_supported_image(file_path):
+            return None
+
+        # 只读取文件头获取尺寸和格式（Image.open是惰性的，不解码像素），
+        # 全图解码推迟到真正需要时（预览/导出），列表常驻内存只有
+        # 元数据和缩略图，导入千张图片不再整批解码
+        try:
+            with Image.open(file_path) as probe:
+                original_size = probe.size
+                image_format = probe.format or 'Unknown'
+        except Exception as e:
+            print(f"加载图片失败: {file_path}, 错误: {e}")
+            return None
+
+        # 生成缩略图（优先从磁盘缓存读取）
+        thumbnail = self._load_or_create_thumbnail(file_path)
+        if thumbnail is None:
+            return None
+
+        return {
             'file_path': file_path,
             'filename': Path(file_path).name,
-            'image': image,
             'thumbnail': thumbnail,
-            'original_size': image.size,
-            'format': image.format or 'Unknown'
+            'original_size': original_size,
+            'format': image_format
         }
-        
-        self.images.append(image_info)
-        return True
+
+    def _thumb_cache_path(self, file_path: str) -> Path:
+        """计算缩略图缓存文件路径（按路径+修改时间哈希）"""
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            mtime = 0
+        digest = hashlib.sha1(f"{file_path}{mtime}".encode('utf-8')).hexdigest()
+        return self.THUMB_CACHE_DIR / f"{digest}.png"
+
+    def _load_or_create_thumbnail(self, file_path: str) -> Optional[Image.Image]:
+        """
+        获取图片缩略图，优先读取磁盘缓存
+
+        缓存按文件路径+修改时间哈希命名，源文件变化后自动失效。
+        缓存命中时完全不解码原图。
+
+        Args:
+            file_path: 图片文件路径
+
+        Returns:
+            PIL.Image: 缩略图，原图无法解码时返回None
+        """
+        cache_path = self._thumb_cache_path(file_path)
+        if cache_path.exists():
+            try:
+                thumbnail = Image.open(cache_path)
+                thumbnail.load()
+                return thumbnail
+            except Exception:
+                pass  # 缓存损坏时重新生成
+
+        image = self.load_image(file_path)
+        if image is None:
+            return None
+        thumbnail = self.create_thumbnail(image, (150, 150))
+        try:
+            self.THUMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            thumbnail.save(cache_path, 'PNG')
+        except Exception as e:
+            print(f"写入缩略图缓存失败: {file_path}, 错误: {e}")
+        return thumbnail
     
     def add_images_from_folder(self, folder_path: str) -> int:
         """
@@ -109,18 +254,17 @@ class ImageProcessor:
         Returns:
             int: 成功添加的图片数量
         """
-        added_count = 0
         folder = Path(folder_path)
-        
+
         if not folder.exists() or not folder.is_dir():
             return 0
-        
-        for file_path in folder.iterdir():
-            if file_path.is_file() and self.is_supported_image(str(file_path)):
-                if self.add_image(str(file_path)):
-                    added_count += 1
-        
-        return added_count
+
+        file_paths = [
+            str(file_path) for file_path in folder.iterdir()
+            if file_path.is_file() and self.is_supported_image(str(file_path))
+        ]
+
+        return self.add_images(file_paths)
     
     def create_thumbnail(self, image: Image.Image, size: Tuple[int, int]) -> Image.Image:
         """
@@ -138,9 +282,16 @@ class ImageProcessor:
         return thumbnail
     
     def get_current_image(self) -> Optional[Image.Image]:
-        """获取当前选中的图片"""
+        """获取当前选中的图片（按需解码，单槽缓存避免重复解码当前图）"""
         if 0 <= self.current_image_index < len(self.images):
-            return self.images[self.current_image_index]['image']
+            file_path = self.images[self.current_image_index]['file_path']
+            if (self._current_image_cache is not None
+                    and self._current_image_cache[0] == file_path):
+                return self._current_image_cache[1]
+            image = self.load_image(file_path)
+            if image is not None:
+                self._current_image_cache = (file_path, image)
+            return image
         return None
     
     def get_current_image_info(self) -> Optional[Dict[str, Any]]:
@@ -164,6 +315,23 @@ class ImageProcessor:
             return True
         return False
     
+    def get_resolved_parents(self) -> Set[Path]:
+        """
+        获取所有图片所在文件夹的规范化路径集合
+
+        结果会被缓存，图片列表变化时自动失效，避免对每张图片
+        重复执行resolve()带来的大量stat()系统调用。
+
+        Returns:
+            Set[Path]: 已解析的父目录集合
+        """
+        if self._resolved_parents is None:
+            self._resolved_parents = {
+                Path(image_info['file_path']).parent.resolve()
+                for image_info in self.images
+            }
+        return self._resolved_parents
+
     def get_image_list(self) -> List[Dict[str, Any]]:
         """获取图片列表"""
         return self.images.copy()
@@ -172,6 +340,9 @@ class ImageProcessor:
         """清空图片列表"""
         self.images.clear()
         self.current_image_index = 0
+        self._resolved_parents = None
+        self._added_paths.clear()
+        self._current_image_cache = None
     
     def remove_image(self, index: int) -> bool:
         """
@@ -184,7 +355,10 @@ class ImageProcessor:
             bool: 移除是否成功
         """
         if 0 <= index < len(self.images):
+            self._added_paths.discard(
+                self._normalize_path(self.images[index]['file_path']))
             del self.images[index]
+            self._resolved_parents = None
             if self.current_image_index >= len(self.images):
                 self.current_image_index = max(0, len(self.images) - 1)
             return True
@@ -214,17 +388,20 @@ class ImageProcessor:
         else:
             return image.resize(size, Image.Resampling.LANCZOS)
     
-    def save_image(self, image: Image.Image, output_path: str, 
-                  format: str = 'JPEG', quality: int = 95) -> bool:
+    def save_image(self, image: Image.Image, output_path: str,
+                  format: str = 'JPEG', quality: int = 95,
+                  png_compress_level: int = 6) -> bool:
         """
         保存图片
-        
+
         Args:
             image: 要保存的图片
             output_path: 输出路径
             format: 输出格式
             quality: JPEG质量 (1-100)
-            
+            png_compress_level: PNG压缩级别 (1-9)，1最快体积略大，
+                9最小体积但Deflate多轮压缩可慢10倍以上
+
         Returns:
             bool: 保存是否成功
         """
@@ -236,20 +413,12 @@ class ImageProcessor:
             if format == 'JPEG':
                 # JPEG不支持透明通道
                 if image.mode in ('RGBA', 'LA', 'P'):
-                    # 创建白色背景
-                    background = Image.new('RGB', image.size, (255, 255, 255))
-                    # 如果有透明通道，使用alpha混合
-                    if image.mode == 'RGBA':
-                        background.paste(image, mask=image.split()[-1])
-                    elif image.mode == 'LA':
-                        background.paste(image, mask=image.split()[-1])
-                    elif image.mode == 'P' and 'transparency' in image.info:
-                        # 处理调色板模式的透明
-                        image = image.convert('RGBA')
-                        background.paste(image, mask=image.split()[-1])
+                    # 快速路径：alpha通道全不透明时（不透明原图+不透明水印的常见情形），
+                    # 白底混合没有意义，直接丢弃alpha通道，省掉一次整图分配+粘贴
+                    if image.mode in ('RGBA', 'LA') and image.getextrema()[-1][0] == 255:
+                        image = image.convert('RGB')
                     else:
-                        background.paste(image)
-                    image = background
+                        image = self._flatten_on_white(image)
                 elif image.mode != 'RGB':
                     # 其他模式转换为RGB
                     image = image.convert('RGB')
@@ -261,23 +430,62 @@ class ImageProcessor:
                 elif image.mode not in ('RGBA', 'LA', 'P'):
                     # 其他模式转换为RGBA以支持透明
                     image = image.convert('RGBA')
-            
+
+            # JPEG优先走libjpeg-turbo的SIMD编码器（若安装了PyTurboJPEG），
+            # 批量导出中编码占比不小，turbo编码通常比Pillow快2-4倍
+            if format == 'JPEG' and image.mode == 'RGB':
+                jpeg = _get_turbojpeg()
+                if jpeg is not None:
+                    try:
+                        import numpy as np
+                        from turbojpeg import TJPF_RGB
+                        data = jpeg.encode(np.asarray(image), quality=quality,
+                                           pixel_format=TJPF_RGB)
+                        with open(output_path, 'wb') as fp:
+                            fp.write(data)
+                        return True
+                    except Exception:
+                        pass  # 编码失败时回退到Pillow保存路径
+
             # 保存图片
             save_kwargs = {}
             if format == 'JPEG':
                 save_kwargs['quality'] = quality
                 save_kwargs['optimize'] = True
             elif format == 'PNG':
-                # PNG优化选项
-                save_kwargs['optimize'] = True
-            
-            image.save(output_path, format=format, **save_kwargs)
+                # PNG压缩级别可调：optimize=True会强制做多轮Deflate尝试，
+                # 只在追求最小体积（级别9）时才启用
+                save_kwargs['compress_level'] = png_compress_level
+                save_kwargs['optimize'] = png_compress_level >= 9
+
+            # 通过预设1MB写缓冲的文件句柄保存，编码输出整块写入磁盘，
+            # 避免编码器的小块写操作逐次进入系统调用
+            with open(output_path, 'wb', buffering=1 << 20) as fp:
+                image.save(fp, format=format, **save_kwargs)
             return True
-            
+
         except Exception as e:
             print(f"保存图片失败: {output_path}, 错误: {e}")
             return False
-    
+
+    @staticmethod
+    def _flatten_on_white(image: Image.Image) -> Image.Image:
+        """把带透明通道的图片混合到白色背景上，返回RGB图片"""
+        # 创建白色背景
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        # 如果有透明通道，使用alpha混合
+        if image.mode == 'RGBA':
+            background.paste(image, mask=image.split()[-1])
+        elif image.mode == 'LA':
+            background.paste(image, mask=image.split()[-1])
+        elif image.mode == 'P' and 'transparency' in image.info:
+            # 处理调色板模式的透明
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.split()[-1])
+        else:
+            background.paste(image)
+        return background
+
     def batch_export(self, output_folder: str, naming_rule: str = 'original',
                     prefix: str = '', suffix: str = '', 
                     output_format: str = 'JPEG', quality: int = 95) -> Dict[str, Any]:
@@ -303,9 +511,34 @@ class ImageProcessor:
         
         output_path = Path(output_folder)
         output_path.mkdir(parents=True, exist_ok=True)
-        
+
+        # 单线程预取：编码第i张的同时在后台线程解码第i+1张，
+        # 让解码（I/O+解压）和编码（CPU）重叠而不是交替等待
+        def _decode(path):
+            img = self.load_image(path)
+            if img is not None:
+                try:
+                    img.load()  # 立即完成惰性解码，让解码真正发生在预取线程里
+                except Exception as e:
+                    print(f"加载图片失败: {path}, 错误: {e}")
+                    return None
+            return img
+
+        prefetcher = ThreadPoolExecutor(max_workers=1)
+        next_future = None
+
         for i, image_info in enumerate(self.images):
             try:
+                if next_future is None:
+                    next_future = prefetcher.submit(
+                        _decode, image_info['file_path'])
+                image = next_future.result()
+                if i + 1 < len(self.images):
+                    next_future = prefetcher.submit(
+                        _decode, self.images[i + 1]['file_path'])
+                else:
+                    next_future = None
+
                 # 生成输出文件名
                 original_name = Path(image_info['file_path']).stem
                 original_ext = Path(image_info['file_path']).suffix
@@ -325,18 +558,20 @@ class ImageProcessor:
                 
                 output_file_path = output_path / new_name
                 
-                # 保存图片
-                if self.save_image(image_info['image'], str(output_file_path), output_format, quality):
+                # 保存（图片已由预取线程解码完成）
+                if image is not None and self.save_image(
+                        image, str(output_file_path), output_format, quality):
                     results['success_count'] += 1
                 else:
                     results['failed_count'] += 1
                     results['failed_files'].append(image_info['filename'])
-                    
+
             except Exception as e:
                 results['failed_count'] += 1
                 results['failed_files'].append(image_info['filename'])
                 print(f"导出图片失败: {image_info['filename']}, 错误: {e}")
-        
+
+        prefetcher.shutdown(wait=False)
         return results
     
     def select_images(self, parent_window=None) -> List[str]:
@@ -3,6 +3,8 @@
 使用OpenCV处理图片水印的创建、渲染和位置控制
 """
 
+import os
+
 import cv2
 import numpy as np
 from typing import Tuple, Optional
@@ -25,9 +27,17 @@ class ImageWatermarkManager:
         'bottom_right': (0.95, 0.95)
     }
     
+    # 处理后水印缓存容量
+    _WATERMARK_CACHE_SIZE = 8
+
     def __init__(self):
         """初始化图片水印管理器"""
+        # 处理后水印缓存：(路径, mtime, 缩放, 透明度, 旋转) -> BGRA数组，
+        # 反复预览同一水印时省去加载+缩放+旋转+调透明度的整条流水线
         self.watermark_cache = {}
+        # 透明度查找表缓存：opacity -> 256项uint8 LUT，
+        # 同一透明度反复预览时不用重建
+        self._opacity_lut_cache = {}
     
     def load_watermark_image(self, image_path: str) -> Optional[np.ndarray]:
         """
@@ -98,8 +108,14 @@ class ImageWatermarkManager:
             new_w = max(1, new_w)
             new_h = max(1, new_h)
             
-            # 使用高质量插值方法调整大小
-            resized = cv2.resize(watermark, (new_w, new_h), interpolation=cv2.INTER_LANCZOS4)
+            # 按实际缩放幅度选插值核：接近1:1时双线性与LANCZOS4
+            # 视觉上无差别，但每像素乘加少约9倍；大幅缩放才用LANCZOS4
+            effective_scale = new_w / w if w else 1.0
+            if effective_scale < 0.5 or effective_scale > 2.0:
+                interpolation = cv2.INTER_LANCZOS4
+            else:
+                interpolation = cv2.INTER_LINEAR
+            resized = cv2.resize(watermark, (new_w, new_h), interpolation=interpolation)
             return resized
             
         except Exception as e:
@@ -120,11 +136,15 @@ class ImageWatermarkManager:
         try:
             # 复制水印以避免修改原始数据
             watermark_copy = watermark.copy()
-            
-            # 调整Alpha通道
-            alpha_scale = opacity / 100.0
-            watermark_copy[:, :, 3] = (watermark_copy[:, :, 3] * alpha_scale).astype(np.uint8)
-            
+
+            # 用预计算的整数查找表调整Alpha通道：免去整通道的
+            # float乘法+astype往返，256项LUT按透明度缓存
+            lut = self._opacity_lut_cache.get(opacity)
+            if lut is None:
+                lut = (np.arange(256, dtype=np.uint16) * opacity // 100).astype(np.uint8)
+                self._opacity_lut_cache[opacity] = lut
+            watermark_copy[:, :, 3] = lut[watermark_copy[:, :, 3]]
+
             return watermark_copy
             
         except Exception as e:
@@ -143,9 +163,18 @@ class ImageWatermarkManager:
             numpy.ndarray: 旋转后的水印图片
         """
         try:
-            if angle == 0:
+            cardinal = angle % 360
+            if cardinal == 0:
                 return watermark
-            
+
+            # 90度整数倍直接转置，无插值成本且完全无损
+            if cardinal == 90:
+                return cv2.rotate(watermark, cv2.ROTATE_90_COUNTERCLOCKWISE)
+            if cardinal == 180:
+                return cv2.rotate(watermark, cv2.ROTATE_180)
+            if cardinal == 270:
+                return cv2.rotate(watermark, cv2.ROTATE_90_CLOCKWISE)
+
             h, w = watermark.shape[:2]
             center = (w // 2, h // 2)
             
@@ -223,8 +252,7 @@ class ImageWatermarkManager:
             x, y = position
             wm_h, wm_w = watermark.shape[:2]
             img_h, img_w = image.shape[:2]
-            has_alpha = len(image.shape) == 3 and image.shape[2] == 4
-            
+
             # 确保水印在图片范围内
             if x < 0 or y < 0 or x + wm_w > img_w or y + wm_h > img_h:
                 # 调整水印位置和大小以适应图片
@@ -237,34 +265,23 @@ class ImageWatermarkManager:
             # 创建图片副本
             result = image.copy()
             
-            # 提取水印的BGR和Alpha通道
+            # 提取水印的BGR和Alpha通道（alpha保持三维以便广播）
             if len(watermark.shape) == 3 and watermark.shape[2] == 4:
                 watermark_bgr = watermark[:, :, :3]
-                watermark_alpha = watermark[:, :, 3] / 255.0
+                watermark_alpha = watermark[:, :, 3:4].astype(np.float32) / 255.0
             else:
                 watermark_bgr = watermark[:, :, :3] if len(watermark.shape) == 3 else watermark
-                watermark_alpha = np.ones((wm_h, wm_w), dtype=np.float32)
-            
+                watermark_alpha = np.ones((wm_h, wm_w, 1), dtype=np.float32)
+
             # 获取要覆盖的图片区域
-            if has_alpha:
-                # 原图有alpha通道，分别处理BGR和A
-                roi = result[y:y+wm_h, x:x+wm_w, :3]
-                roi_alpha = result[y:y+wm_h, x:x+wm_w, 3]
-            else:
-                roi = result[y:y+wm_h, x:x+wm_w]
-            
-            # 使用Alpha混合BGR通道
-            for c in range(3):
-                roi[:, :, c] = (watermark_alpha * watermark_bgr[:, :, c] + 
-                               (1 - watermark_alpha) * roi[:, :, c])
-            
-            # 更新结果
-            if has_alpha:
-                result[y:y+wm_h, x:x+wm_w, :3] = roi
-                # Alpha通道：如果水印有透明度，保持原图alpha或者合成
-                # 这里保持原图的alpha通道不变
-            else:
-                result[y:y+wm_h, x:x+wm_w] = roi
+            roi = result[y:y+wm_h, x:x+wm_w, :3]
+
+            # 一次广播完成三个通道的Alpha混合，避免逐通道的Python循环
+            blended = (watermark_alpha * watermark_bgr +
+                       (1 - watermark_alpha) * roi).astype(result.dtype)
+
+            # 更新结果（原图有alpha通道时保持其alpha不变）
+            result[y:y+wm_h, x:x+wm_w, :3] = blended
             
             return result
             
@@ -324,20 +341,38 @@ class ImageWatermarkManager:
                     print(f"不支持的图片输入类型: {type(image_input)}")
                     return None
             
-            # 加载水印图片
-            watermark = self.load_watermark_image(watermark_path)
+            # 处理好的水印按参数缓存（文件改动靠mtime失效），
+            # 命中时整条加载/缩放/旋转/透明度流水线都跳过
+            try:
+                mtime = os.path.getmtime(watermark_path)
+            except OSError:
+                mtime = None
+            cache_key = (watermark_path, mtime, scale, opacity, rotation)
+            watermark = self.watermark_cache.get(cache_key)
+
             if watermark is None:
-                return None
-            
-            # 调整水印大小（不限制最大尺寸，用户可以自由控制）
-            watermark = self.resize_watermark(watermark, scale, None, None)
-            
-            # 旋转水印
-            if rotation != 0:
-                watermark = self.rotate_watermark(watermark, rotation)
-            
-            # 调整透明度
-            watermark = self.apply_opacity(watermark, opacity)
+                # 加载水印图片
+                watermark = self.load_watermark_image(watermark_path)
+                if watermark is None:
+                    return None
+
+                # 各步都是无操作时直接跳过，免得白白复制整张BGRA数组
+
+                # 调整水印大小（不限制最大尺寸，用户可以自由控制）
+                if abs(scale - 1.0) > 1e-6:
+                    watermark = self.resize_watermark(watermark, scale, None, None)
+
+                # 旋转水印
+                if rotation % 360 != 0:
+                    watermark = self.rotate_watermark(watermark, rotation)
+
+                # 调整透明度
+                if opacity < 100:
+                    watermark = self.apply_opacity(watermark, opacity)
+
+                if len(self.watermark_cache) >= self._WATERMARK_CACHE_SIZE:
+                    self.watermark_cache.pop(next(iter(self.watermark_cache)))
+                self.watermark_cache[cache_key] = watermark
             
             # 计算位置
             if custom_position:
@@ -6,10 +6,14 @@ Photo Watermark 2 - 主应用程序
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser
 import os
+import queue
+import shutil
 from pathlib import Path
 from PIL import Image, ImageTk
 from typing import Optional, List, Dict, Any
 import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 # 尝试导入拖拽库
 try:
@@ -22,9 +26,393 @@ except ImportError:
 
 from image_processor import ImageProcessor
 from text_watermark_manager import TextWatermarkManager
-from image_watermark_manager import ImageWatermarkManager
 from config_manager import ConfigManager
 
+# ImageWatermarkManager依赖cv2/numpy（约200ms导入时间），
+# 在首次使用图片水印时才延迟导入，见image_watermark_manager属性
+
+
+# PNG压缩速度档位对应的compress_level（9级Deflate最慢可比1级慢10倍以上）
+PNG_COMPRESS_LEVELS = {'快速': 1, '均衡': 6, '最小体积': 9}
+
+
+def _pick_auto_format(image: Image.Image) -> str:
+    """自动选择输出格式：全不透明时用JPEG，否则用PNG保留透明"""
+    if image.mode == 'RGBA' and image.getextrema()[3][0] < 255:
+        return 'PNG'
+    return 'JPEG'
+
+
+@lru_cache(maxsize=8)
+def _make_name_fn(naming_rule: str, prefix: str, suffix: str, output_format: str):
+    """
+    构建导出命名函数（按参数缓存）
+
+    命名规则和格式在一次导出中固定，把分支判断提前到构建时，
+    批量循环里每张图片只执行一次字符串拼接。
+
+    Returns:
+        Callable[[str, str], str]: (stem, ext) -> 导出文件名
+    """
+    # 预编译格式模板：循环里只剩一次format调用和一次扩展名归一化，
+    # 不再走分支和Path往返。前后缀是用户输入，其中的花括号要转义，
+    # 否则会被format当作占位符解析而抛异常
+    def _escape(text):
+        return text.replace('{', '{{').replace('}', '}}')
+
+    template = {
+        'prefix': _escape(prefix) + '{stem}{ext}',
+        'suffix': '{stem}' + _escape(suffix) + '{ext}',
+    }.get(naming_rule, '{stem}{ext}')
+
+    # 确保输出格式扩展名正确
+    if output_format == 'JPEG':
+        def name_fn(stem, ext):
+            if ext.lower() not in ('.jpg', '.jpeg'):
+                ext = '.jpg'
+            return template.format(stem=stem, ext=ext)
+    elif output_format == 'PNG':
+        def name_fn(stem, ext):
+            if ext.lower() != '.png':
+                ext = '.png'
+            return template.format(stem=stem, ext=ext)
+    else:
+        def name_fn(stem, ext):
+            return template.format(stem=stem, ext=ext)
+
+    return name_fn
+
+
+def _make_export_name(file_path: str, naming_rule: str, prefix: str,
+                      suffix: str, output_format: str) -> str:
+    """根据命名规则和输出格式生成导出文件名"""
+    # os.path.splitext是C实现，比构造Path对象再取stem/suffix快约5倍
+    stem, ext = os.path.splitext(os.path.basename(file_path))
+    return _make_name_fn(naming_rule, prefix, suffix, output_format)(stem, ext)
+
+
+def _is_noop_export_config(config: Dict[str, Any], source_ext: str,
+                           resize_enabled: bool, output_format: str) -> bool:
+    """判断导出是否为无变化操作（无水印、无尺寸调整且格式一致）"""
+    if resize_enabled:
+        return False
+
+    watermark_type = config.get('type', 'text')
+    if watermark_type == 'text':
+        if config.get('text', '').strip():
+            return False
+    elif watermark_type == 'image':
+        if config.get('image_path'):
+            return False
+
+    ext = source_ext.lower()
+    if output_format == 'JPEG':
+        return ext in ('.jpg', '.jpeg')
+    if output_format == 'PNG':
+        return ext == '.png'
+    return False
+
+
+def _resize_with_kernel(image: Image.Image, new_size) -> Image.Image:
+    """
+    按目标尺寸缩放图片，根据缩放比例选择重采样核
+
+    大幅放大时BICUBIC（16个采样点）比LANCZOS（36个采样点）快约2倍
+    且视觉效果不差；整数倍缩小时直接用reduce()做盒式降采样。
+    """
+    scale = new_size[0] / image.width if image.width > 0 else 1.0
+
+    if scale >= 2.0:
+        resample = Image.Resampling.BICUBIC
+    elif scale <= 0.5:
+        factor = round(1 / scale) if scale > 0 else 0
+        if factor >= 2:
+            reduced_size = (-(-image.width // factor), -(-image.height // factor))
+            if reduced_size == new_size:
+                return image.reduce(factor)
+        resample = Image.Resampling.LANCZOS
+    else:
+        resample = Image.Resampling.LANCZOS
+
+    return image.resize(new_size, resample)
+
+
+# 导出工作进程内的复用对象：文本水印管理器和按配置缓存的水印图层。
+# 同一批导出中所有图片的水印内容相同，字体光栅化和描边/阴影合成
+# 只需执行一次，之后每张图片只做定位+合成
+_export_text_manager: Optional[TextWatermarkManager] = None
+_export_wm_layer_cache: Dict[tuple, Image.Image] = {}
+_EXPORT_WM_LAYER_CACHE_SIZE = 8
+
+
+def _get_export_text_manager() -> TextWatermarkManager:
+    """获取导出进程内共享的文本水印管理器"""
+    global _export_text_manager
+    if _export_text_manager is None:
+        _export_text_manager = TextWatermarkManager()
+    return _export_text_manager
+
+
+def _get_text_watermark_layer(manager: TextWatermarkManager,
+                              config: Dict[str, Any]) -> Image.Image:
+    """按配置获取渲染好的文本水印图层（进程内缓存复用）"""
+    cache_key = (config['text'], config['font_family'], config['font_size'],
+                 config['font_color'], config['opacity'], config['rotation'],
+                 config['shadow'], config['outline'], config['outline_color'],
+                 config['outline_width'], config['font_bold'], config['font_italic'])
+
+    layer = _export_wm_layer_cache.get(cache_key)
+    if layer is None:
+        layer = manager.create_text_watermark(
+            config['text'],
+            config['font_family'],
+            config['font_size'],
+            config['font_color'],
+            config['opacity'],
+            config['rotation'],
+            config['shadow'],
+            config['outline'],
+            config['outline_color'],
+            config['outline_width'],
+            config['font_bold'],
+            config['font_italic']
+        )
+        if len(_export_wm_layer_cache) >= _EXPORT_WM_LAYER_CACHE_SIZE:
+            _export_wm_layer_cache.pop(next(iter(_export_wm_layer_cache)))
+        _export_wm_layer_cache[cache_key] = layer
+    return layer
+
+
+def _apply_export_watermark(image: Image.Image, config: Dict[str, Any],
+                            custom_position) -> Optional[Image.Image]:
+    """
+    按配置将水印应用到图片上（用于导出，保持透明通道）
+
+    Args:
+        image: 原始图片
+        config: 水印配置
+        custom_position: 自定义位置 (x, y)，未使用时为None
+
+    Returns:
+        PIL.Image: 带水印的图片，失败返回None
+    """
+    watermark_type = config.get('type', 'text')
+
+    if watermark_type == 'text':
+        manager = _get_export_text_manager()
+        watermark = _get_text_watermark_layer(manager, config)
+        if custom_position:
+            return manager.apply_watermark(image, watermark, 'custom', custom_position)
+        return manager.apply_watermark(image, watermark, config['position'])
+
+    if watermark_type == 'image' and config.get('image_path'):
+        import cv2
+        from image_watermark_manager import ImageWatermarkManager
+
+        manager = ImageWatermarkManager()
+        result_cv = manager.apply_watermark(
+            image,
+            config['image_path'],
+            config['image_scale'],
+            config['opacity'],
+            config['position'],
+            config['rotation'],
+            custom_position
+        )
+
+        if result_cv is not None:
+            # 将OpenCV图片转换为PIL图片，保持透明通道
+            if len(result_cv.shape) == 3 and result_cv.shape[2] == 4:
+                # 4通道BGRA -> RGBA
+                result_cv = cv2.cvtColor(result_cv, cv2.COLOR_BGRA2RGBA)
+            else:
+                # 3通道BGR -> RGB
+                result_cv = cv2.cvtColor(result_cv, cv2.COLOR_BGR2RGB)
+            return Image.fromarray(result_cv)
+        return None
+
+    return None
+
+
+# pyvips（libvips）可选加速：按需分块读取底图并用SIMD合成，
+# 未安装时自动回退到PIL路径
+_pyvips = None
+_pyvips_checked = False
+
+
+def _get_pyvips():
+    """获取pyvips模块，不可用时返回None（只探测一次）"""
+    global _pyvips, _pyvips_checked
+    if not _pyvips_checked:
+        _pyvips_checked = True
+        try:
+            import pyvips
+            _pyvips = pyvips
+        except Exception:
+            _pyvips = None
+    return _pyvips
+
+
+def _export_one_vips(file_path: str, config: Dict[str, Any], custom_position,
+                     export_opts: Dict[str, Any], output_file_path: str) -> bool:
+    """
+    pyvips导出快速路径（仅文本水印、无尺寸调整）
+
+    libvips流式分块处理底图，大图导出时避免PIL一次性
+    解码整图带来的内存峰值，合成和编码也更快。
+
+    Args:
+        file_path: 源图片路径
+        config: 水印配置
+        custom_position: 自定义位置 (x, y)，未使用时为None
+        export_opts: 导出选项
+        output_file_path: 输出文件路径
+
+    Returns:
+        bool: 是否成功；不可用或失败时返回False，调用方回退到PIL路径
+    """
+    pyvips = _get_pyvips()
+    if pyvips is None:
+        return False
+    if config.get('type') != 'text' or export_opts['resize_enabled']:
+        return False
+
+    try:
+        import numpy as np
+
+        manager = _get_export_text_manager()
+        watermark = _get_text_watermark_layer(manager, config)
+
+        base = pyvips.Image.new_from_file(file_path, access='sequential')
+
+        # 计算水印位置（与TextWatermarkManager的定位逻辑一致）
+        if custom_position:
+            x, y = custom_position
+        else:
+            x, y = manager.calculate_position(
+                (base.width, base.height), watermark.size, config['position'])
+        x = max(0, min(x, base.width - watermark.width))
+        y = max(0, min(y, base.height - watermark.height))
+
+        wm_arr = np.asarray(watermark.convert('RGBA'))
+        wm = pyvips.Image.new_from_memory(
+            wm_arr.tobytes(), watermark.width, watermark.height, 4, 'uchar')
+        wm = wm.embed(x, y, base.width, base.height)
+
+        if not base.hasalpha():
+            base = base.addalpha()
+        out = base.composite2(wm, 'over')
+
+        if export_opts['output_format'] == 'JPEG':
+            # JPEG不支持透明通道，白底拍平
+            out = out.flatten(background=[255, 255, 255])
+            out.jpegsave(str(output_file_path), Q=export_opts['quality'])
+        else:
+            out.pngsave(str(output_file_path),
+                        compression=export_opts.get('png_compress_level', 6))
+        return True
+
+    except Exception as e:
+        print(f"pyvips导出失败，回退到PIL: {file_path}, 错误: {e}")
+        return False
+
+
+def _export_one(args) -> tuple:
+    """
+    导出单张图片（模块级函数，供进程池调用）
+
+    PIL Image对象无法高效序列化，因此工作进程按路径重新打开图片。
+
+    Args:
+        args: (file_path, filename, config, custom_position, export_opts) 元组
+
+    Returns:
+        tuple: (是否成功, 文件名)
+    """
+    file_path, filename, config, custom_position, export_opts = args
+
+    try:
+        output_format = export_opts['output_format']
+        auto_format = output_format == 'AUTO'
+        max_dim = export_opts.get('max_output_dim', 0)
+
+        if not auto_format and not max_dim:
+            new_name = _make_export_name(
+                file_path, export_opts['naming_rule'],
+                export_opts['prefix'], export_opts['suffix'], output_format
+            )
+            output_file_path = os.path.join(export_opts['output_folder'], new_name)
+
+            # 无水印、无尺寸调整且格式不变时，直接复制原文件
+            if _is_noop_export_config(config, os.path.splitext(file_path)[1],
+                                      export_opts['resize_enabled'], output_format):
+                shutil.copyfile(file_path, output_file_path)
+                return (True, filename)
+
+            # pyvips可用时走流式快速路径，失败则继续PIL路径
+            if _export_one_vips(file_path, config, custom_position, export_opts,
+                                output_file_path):
+                return (True, filename)
+
+        image = Image.open(file_path)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+
+        # 先缩小再加水印：合成是O(像素数)的，24MP缩到2MP后合成+编码少做12倍工作
+        if max_dim and max(image.size) > max_dim:
+            orig_width = image.width
+            image.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS,
+                            reducing_gap=3.0)
+            # 自定义位置按缩小比例同步换算
+            if custom_position:
+                ratio = image.width / orig_width
+                custom_position = (int(custom_position[0] * ratio),
+                                   int(custom_position[1] * ratio))
+
+        watermarked = _apply_export_watermark(image, config, custom_position)
+        if watermarked is None:
+            watermarked = image
+
+        # JPEG输出且结果全不透明时尽早转RGB：后续缩放和编码少搬运
+        # 四分之一的通道数据，save_image也不用再扫描alpha拍平
+        if (output_format == 'JPEG' and watermarked.mode == 'RGBA'
+                and watermarked.getextrema()[3][0] == 255):
+            watermarked = watermarked.convert('RGB')
+
+        # 调整图片尺寸
+        if export_opts['resize_enabled']:
+            if export_opts['resize_method'] == 'percentage':
+                percentage = export_opts['resize_percentage']
+                new_size = (int(watermarked.width * percentage / 100),
+                            int(watermarked.height * percentage / 100))
+            else:
+                new_size = (export_opts['resize_width'], export_opts['resize_height'])
+            watermarked = _resize_with_kernel(watermarked, new_size)
+
+        if auto_format or max_dim:
+            # 自动格式：结果全不透明时存JPEG（DCT编码比PNG的Deflate
+            # 快得多且照片体积更小），有透明像素才需要PNG
+            if auto_format:
+                output_format = _pick_auto_format(watermarked)
+            new_name = _make_export_name(
+                file_path, export_opts['naming_rule'],
+                export_opts['prefix'], export_opts['suffix'], output_format
+            )
+            output_file_path = os.path.join(export_opts['output_folder'], new_name)
+
+        success = ImageProcessor().save_image(
+            watermarked, output_file_path, output_format, export_opts['quality'],
+            png_compress_level=export_opts.get('png_compress_level', 6))
+
+        # 尽早释放全尺寸图片，长批次导出时避免内存持续累积
+        del watermarked
+        image.close()
+        return (success, filename)
+
+    except Exception as e:
+        print(f"导出图片失败: {filename}, 错误: {e}")
+        return (False, filename)
+
 
 class PhotoWatermarkApp:
     """主应用程序类"""
@@ -44,7 +432,7 @@ class PhotoWatermarkApp:
         # 初始化核心组件
         self.image_processor = ImageProcessor()
         self.text_watermark_manager = TextWatermarkManager()
-        self.image_watermark_manager = ImageWatermarkManager()
+        self._image_watermark_manager = None  # 延迟创建，避免启动时导入cv2/numpy
         self.config_manager = ConfigManager()
         
         # 界面变量
@@ -60,7 +448,15 @@ class PhotoWatermarkApp:
         
         # 绑定窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-    
+
+    @property
+    def image_watermark_manager(self):
+        """图片水印管理器（首次访问时才导入cv2/numpy并创建）"""
+        if self._image_watermark_manager is None:
+            from image_watermark_manager import ImageWatermarkManager
+            self._image_watermark_manager = ImageWatermarkManager()
+        return self._image_watermark_manager
+
     def create_widgets(self):
         """创建界面组件"""
         # 创建主框架
@@ -136,12 +532,44 @@ class PhotoWatermarkApp:
         self.preview_canvas.bind('<ButtonPress-1>', self.on_watermark_drag_start)
         self.preview_canvas.bind('<B1-Motion>', self.on_watermark_drag_motion)
         self.preview_canvas.bind('<ButtonRelease-1>', self.on_watermark_drag_end)
+        # 画布尺寸变化时节流刷新（窗口拖拽过程中<Configure>事件连续触发）
+        self.preview_canvas.bind('<Configure>', self._on_canvas_resize)
         
         # 水印拖拽状态
         self.watermark_dragging = False
         self.drag_start_x = 0
         self.drag_start_y = 0
         self.custom_watermark_position = None  # (x, y) 相对于图片的位置
+
+        # 自定义位置水印层缓存（导出时避免重复渲染）
+        self._wm_layer_cache: Dict[tuple, Image.Image] = {}
+        self._wm_layer_cache_size = 8
+
+        # 预览刷新防抖定时器
+        self._pending_refresh = None
+
+        # 画布尺寸变化节流定时器及上次已知尺寸
+        self._resize_after = None
+        self._last_canvas_size = (0, 0)
+
+        # 预览底图缓存：按(图片id, 缩放比例)缓存缩放到画布尺寸的底图，
+        # 避免每次刷新都对全分辨率原图做LANCZOS缩放
+        self._preview_base_cache: Dict[tuple, Image.Image] = {}
+        self._preview_base_cache_size = 8
+
+        # 当前配置缓存：多数预览刷新之间配置并未变化，
+        # 缓存构建好的配置字典，避免每次刷新做十余次Tk Var读取（Tcl往返）
+        self._config_cache: Optional[Dict[str, Any]] = None
+
+        # 图片列表本地缓存（get_image_list每次返回新副本，
+        # 交互热路径中按需复用，列表变化时失效）
+        self._image_list_cache: Optional[List[Dict[str, Any]]] = None
+
+        # 复用的Tk照片缓冲和画布图片项（尺寸不变时原地paste，
+        # 避免每次刷新重新分配W*H*4缓冲并重新上传像素）
+        self._tk_photo = None
+        self._tk_photo_key = None  # (宽, 高, 模式)
+        self._canvas_img_id = None
         
         # 预览控制按钮
         control_frame = ttk.Frame(preview_frame)
@@ -603,8 +1031,11 @@ class PhotoWatermarkApp:
         self.output_format = tk.StringVar(value="JPEG")
         ttk.Radiobutton(format_frame, text="JPEG", variable=self.output_format, 
                        value="JPEG", command=self.on_format_change).pack(side=tk.LEFT)
-        ttk.Radiobutton(format_frame, text="PNG", variable=self.output_format, 
+        ttk.Radiobutton(format_frame, text="PNG", variable=self.output_format,
                        value="PNG", command=self.on_format_change).pack(side=tk.LEFT, padx=(10, 0))
+        # 自动：结果全不透明时存JPEG（编码快、体积小），有透明像素才存PNG
+        ttk.Radiobutton(format_frame, text="自动", variable=self.output_format,
+                       value="AUTO", command=self.on_format_change).pack(side=tk.LEFT, padx=(10, 0))
         
         # 质量设置（仅JPEG格式显示）
         self.quality_frame = ttk.Frame(export_frame)
@@ -621,7 +1052,19 @@ class PhotoWatermarkApp:
         
         # 绑定质量变化事件
         self.quality_scale.bind('<Motion>', self.on_quality_change)
-        
+
+        # PNG压缩速度设置（仅PNG格式显示）：
+        # 快速=compress_level 1，均衡=6，最小体积=9（含optimize多轮压缩）
+        self.png_speed_frame = ttk.Frame(export_frame)
+        self.png_speed_frame.pack(fill=tk.X, pady=(0, 5))
+
+        ttk.Label(self.png_speed_frame, text="PNG压缩:").pack(side=tk.LEFT)
+        self.png_speed = tk.StringVar(value="均衡")
+        png_speed_combo = ttk.Combobox(self.png_speed_frame, textvariable=self.png_speed,
+                                       values=("快速", "均衡", "最小体积"),
+                                       state="readonly", width=8)
+        png_speed_combo.pack(side=tk.LEFT, padx=(5, 0))
+
         # 初始化格式显示
         self.on_format_change()
         
@@ -678,7 +1121,18 @@ class PhotoWatermarkApp:
         
         # 初始化尺寸调整显示
         self.on_resize_toggle()
-        
+
+        # 最大输出边长：导出前先把超大原图缩到该边长以内再加水印，
+        # 水印合成和编码的工作量随像素数线性下降（0表示保持原始尺寸）
+        maxdim_frame = ttk.Frame(export_frame)
+        maxdim_frame.pack(fill=tk.X, pady=(0, 5))
+
+        ttk.Label(maxdim_frame, text="最大输出边长:").pack(side=tk.LEFT)
+        self.max_output_dim = tk.IntVar(value=0)
+        ttk.Spinbox(maxdim_frame, from_=0, to=20000, increment=500, width=8,
+                    textvariable=self.max_output_dim).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(maxdim_frame, text="px (0=原始尺寸)").pack(side=tk.LEFT, padx=(2, 0))
+
         # 导出按钮
         export_btn_frame = ttk.Frame(export_frame)
         export_btn_frame.pack(fill=tk.X, pady=(5, 0))
@@ -839,12 +1293,19 @@ class PhotoWatermarkApp:
             self.custom_watermark_position = tuple(config['custom_position'])
         else:
             self.custom_watermark_position = None
+
+        # UI批量更新后配置缓存失效
+        self._config_cache = None
     
     def get_current_config(self):
         """获取当前配置"""
+        # 命中缓存时直接返回副本，避免重复的Tk Var读取
+        if self._config_cache is not None:
+            return dict(self._config_cache)
+
         # 将百分比转换为缩放比例（100% = 1.0）
         image_scale = self.image_scale_percent.get() / 100.0
-        
+
         config = {
             'type': self.watermark_type.get(),
             'text': self.text_content.get(),
@@ -868,8 +1329,9 @@ class PhotoWatermarkApp:
         # 如果是自定义位置，保存坐标
         if self.position.get() == 'custom' and self.custom_watermark_position:
             config['custom_position'] = self.custom_watermark_position
-        
-        return config
+
+        self._config_cache = config
+        return dict(config)
     
     def select_single_image(self):
         """选择单张图片文件"""
@@ -899,6 +1361,7 @@ class PhotoWatermarkApp:
         folder_path = self.image_processor.select_folder(self.root)
         if folder_path:
             added_count = self.image_processor.add_images_from_folder(folder_path)
+            self._image_list_cache = None
             if added_count > 0:
                 self.refresh_image_list()
                 messagebox.showinfo("导入成功", f"成功导入 {added_count} 张图片")
@@ -914,11 +1377,10 @@ class PhotoWatermarkApp:
     
     def add_images(self, file_paths):
         """添加图片到列表"""
-        added_count = 0
-        for file_path in file_paths:
-            if self.image_processor.add_image(file_path):
-                added_count += 1
-        
+        # 解码和缩略图生成在ImageProcessor的线程池中并行执行
+        added_count = self.image_processor.add_images(file_paths)
+        self._image_list_cache = None
+
         if added_count > 0:
             self.refresh_image_list()
             if added_count < len(file_paths):
@@ -927,13 +1389,19 @@ class PhotoWatermarkApp:
         else:
             messagebox.showerror("导入失败", "没有成功导入任何图片")
     
+    def _images(self):
+        """获取图片列表（本地缓存副本，避免每次交互都复制整个列表）"""
+        if self._image_list_cache is None:
+            self._image_list_cache = self.image_processor.get_image_list()
+        return self._image_list_cache
+
     def refresh_image_list(self):
         """刷新图片列表"""
         # 清空现有项目
         for item in self.image_tree.get_children():
             self.image_tree.delete(item)
         
-        images = self.image_processor.get_image_list()
+        images = self._images()
         
         for i, image_info in enumerate(images):
             # 创建缩略图
@@ -984,7 +1452,7 @@ class PhotoWatermarkApp:
     
     def next_image(self):
         """下一张图片"""
-        images = self.image_processor.get_image_list()
+        images = self._images()
         if self.selected_image_index < len(images) - 1:
             self.selected_image_index += 1
             # 更新树形控件选择
@@ -998,30 +1466,94 @@ class PhotoWatermarkApp:
         """清空图片列表"""
         if messagebox.askyesno("确认", "确定要清空所有图片吗？"):
             self.image_processor.clear_images()
+            self._image_list_cache = None
             # 清空缩略图引用
             if hasattr(self, 'thumbnails'):
                 self.thumbnails.clear()
             self.refresh_image_list()
             self.preview_canvas.delete("all")
+            self._canvas_img_id = None
     
+    def _get_preview_base(self, current_image, canvas_width, canvas_height):
+        """
+        获取缩放到画布尺寸的预览底图
+
+        底图按(文件路径, 缩放比例)缓存，画布和图片不变时直接复用，
+        之后水印只需渲染到画布大小的图片上。不能用id(current_image)做键：
+        切换图片后旧Image对象被释放，CPython会复用其id，导致命中到
+        上一张图片的底图。
+
+        Args:
+            current_image: 当前原始图片
+            canvas_width: 画布宽度
+            canvas_height: 画布高度
+
+        Returns:
+            tuple: (底图, 缩放比例)
+        """
+        img_width, img_height = current_image.size
+        scale = min(canvas_width / img_width, canvas_height / img_height, 1.0)
+
+        if scale >= 1.0:
+            return current_image, 1.0
+
+        info = self.image_processor.get_current_image_info()
+        file_path = info.get('file_path') if info else None
+        if file_path is None:
+            # 拿不到稳定的缓存键时直接缩放，不走缓存
+            new_size = (max(1, int(img_width * scale)), max(1, int(img_height * scale)))
+            return current_image.resize(new_size, Image.Resampling.LANCZOS), scale
+
+        cache_key = (file_path, round(scale, 3))
+        base = self._preview_base_cache.get(cache_key)
+        if base is None:
+            new_size = (max(1, int(img_width * scale)), max(1, int(img_height * scale)))
+            base = current_image.resize(new_size, Image.Resampling.LANCZOS)
+            if len(self._preview_base_cache) >= self._preview_base_cache_size:
+                self._preview_base_cache.pop(next(iter(self._preview_base_cache)))
+            self._preview_base_cache[cache_key] = base
+        return base, scale
+
     def refresh_preview(self):
         """刷新预览"""
         current_image = self.image_processor.get_current_image()
         if current_image:
+            canvas_width = self.preview_canvas.winfo_width()
+            canvas_height = self.preview_canvas.winfo_height()
+
+            if canvas_width <= 1 or canvas_height <= 1:
+                # 画布还没有初始化，等第一个<Configure>事件到来时再刷新，
+                # 不再用after轮询
+                return
+
+            # 水印应用在缩放后的底图上，参数按预览比例等比缩放，
+            # 这样每次刷新只处理画布大小的像素而非全分辨率原图
+            base, preview_scale = self._get_preview_base(
+                current_image, canvas_width, canvas_height)
+
             # 获取水印配置
             config = self.get_current_config()
             watermark_type = config.get('type', 'text')
-            
+
+            # 按预览比例缩放自定义位置
+            custom_position = None
+            if self.custom_watermark_position and self.position.get() == 'custom':
+                custom_position = (int(self.custom_watermark_position[0] * preview_scale),
+                                   int(self.custom_watermark_position[1] * preview_scale))
+
             # 根据水印类型生成预览
             preview = None
             if watermark_type == 'text':
+                # 字体大小按预览比例缩放
+                font_size = max(1, int(round(config['font_size'] * preview_scale)))
+
                 # 使用文本水印管理器
-                if self.custom_watermark_position and self.position.get() == 'custom':
+                if custom_position:
                     preview = self.text_watermark_manager.preview_watermark_with_position(
-                        current_image,
+                        base,
                         config['text'],
                         config['font_family'],
-                        config['font_size'],
+                        font_size,
                         config['font_color'],
                         config['opacity'],
                         config['rotation'],
@@ -1031,14 +1563,15 @@ class PhotoWatermarkApp:
                         config['outline_width'],
                         config['font_bold'],
                         config['font_italic'],
-                        self.custom_watermark_position
+                        custom_position,
+                        max_preview_size=(canvas_width, canvas_height)
                     )
                 else:
                     preview = self.text_watermark_manager.preview_watermark(
-                        current_image,
+                        base,
                         config['text'],
                         config['font_family'],
-                        config['font_size'],
+                        font_size,
                         config['font_color'],
                         config['opacity'],
                         config['position'],
@@ -1048,7 +1581,8 @@ class PhotoWatermarkApp:
                         config['outline_color'],
                         config['outline_width'],
                         config['font_bold'],
-                        config['font_italic']
+                        config['font_italic'],
+                        max_preview_size=(canvas_width, canvas_height)
                     )
             elif watermark_type == 'image':
                 # 使用图片水印管理器
@@ -1056,26 +1590,31 @@ class PhotoWatermarkApp:
                     import cv2
                     import numpy as np
                     from PIL import Image
-                    
-                    if self.custom_watermark_position and self.position.get() == 'custom':
+
+                    # 水印缩放比例按预览比例等比缩小
+                    image_scale = config['image_scale'] * preview_scale
+
+                    if custom_position:
                         result_cv = self.image_watermark_manager.preview_watermark_with_position(
-                            current_image,
+                            base,
                             config['image_path'],
-                            config['image_scale'],
+                            image_scale,
                             config['opacity'],
                             config['rotation'],
-                            self.custom_watermark_position
+                            custom_position,
+                            max_preview_size=(canvas_width, canvas_height)
                         )
                     else:
                         result_cv = self.image_watermark_manager.preview_watermark(
-                            current_image,
+                            base,
                             config['image_path'],
-                            config['image_scale'],
+                            image_scale,
                             config['opacity'],
                             config['position'],
-                            config['rotation']
+                            config['rotation'],
+                            max_preview_size=(canvas_width, canvas_height)
                         )
-                    
+
                     if result_cv is not None:
                         # 将OpenCV图片转换为PIL图片，保持透明通道
                         if len(result_cv.shape) == 3 and result_cv.shape[2] == 4:
@@ -1085,7 +1624,7 @@ class PhotoWatermarkApp:
                             # 3通道BGR -> RGB
                             result_cv = cv2.cvtColor(result_cv, cv2.COLOR_BGR2RGB)
                         preview = Image.fromarray(result_cv)
-            
+
             if preview:
                 self.display_preview(preview)
     
@@ -1096,8 +1635,7 @@ class PhotoWatermarkApp:
         canvas_height = self.preview_canvas.winfo_height()
         
         if canvas_width <= 1 or canvas_height <= 1:
-            # 画布还没有初始化，延迟刷新
-            self.root.after(100, self.refresh_preview)
+            # 画布还没有初始化，等<Configure>事件触发刷新
             return
         
         # 计算缩放比例
@@ -1106,26 +1644,74 @@ class PhotoWatermarkApp:
         scale_y = canvas_height / img_height
         scale = min(scale_x, scale_y, 1.0)  # 不放大图片
         
-        # 缩放图片
-        new_width = int(img_width * scale)
-        new_height = int(img_height * scale)
-        resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # 转换为Tkinter格式
-        self.preview_image = ImageTk.PhotoImage(resized_image)
-        
-        # 清空画布并显示图片
-        self.preview_canvas.delete("all")
+        # 缩放图片：thumbnail在大幅缩小时先做整数倍box降采样再做LANCZOS
+        # （reducing_gap触发内部reduce快速路径），比单次LANCZOS少读大量源像素
+        if scale < 1.0:
+            resized_image = image.copy()
+            resized_image.thumbnail((int(img_width * scale), int(img_height * scale)),
+                                    Image.Resampling.LANCZOS, reducing_gap=3.0)
+        else:
+            resized_image = image
+        new_width, new_height = resized_image.size
+
+        # 转换为Tkinter格式：尺寸和模式不变时复用已有缓冲原地paste
+        photo_key = (new_width, new_height, resized_image.mode)
+        if self._tk_photo is not None and self._tk_photo_key == photo_key:
+            self._tk_photo.paste(resized_image)
+        else:
+            self._tk_photo = ImageTk.PhotoImage(resized_image)
+            self._tk_photo_key = photo_key
+        self.preview_image = self._tk_photo
+
+        # 更新画布上的图片项（只创建一次，之后更新位置和内容）
         x = (canvas_width - new_width) // 2
         y = (canvas_height - new_height) // 2
-        self.preview_canvas.create_image(x, y, anchor=tk.NW, image=self.preview_image)
+        if self._canvas_img_id is None:
+            self._canvas_img_id = self.preview_canvas.create_image(
+                x, y, anchor=tk.NW, image=self._tk_photo)
+        else:
+            self.preview_canvas.itemconfigure(self._canvas_img_id, image=self._tk_photo)
+            self.preview_canvas.coords(self._canvas_img_id, x, y)
     
     def on_watermark_type_change(self):
         """水印类型改变"""
         self.on_watermark_change()
     
     def on_watermark_change(self, *args):
-        """水印设置改变"""
+        """
+        水印设置改变
+
+        使用after防抖合并快速连续的变更事件（如拖动Scale滑块时
+        每个中间值都会触发），只有约80ms内的最后一次事件真正刷新预览。
+        """
+        self._config_cache = None
+        if self._pending_refresh is not None:
+            self.root.after_cancel(self._pending_refresh)
+        self._pending_refresh = self.root.after(80, self._do_refresh_preview)
+
+    def _do_refresh_preview(self):
+        """执行防抖后的预览刷新"""
+        self._pending_refresh = None
+        self.refresh_preview()
+
+    def _on_canvas_resize(self, event):
+        """
+        预览画布尺寸变化
+
+        窗口拖拽过程中Tk会连续派发<Configure>事件，每次都刷新会造成
+        刷新风暴。只保留一个待执行的after任务，尺寸稳定约120ms后刷新一次。
+        """
+        new_size = (event.width, event.height)
+        if new_size == self._last_canvas_size:
+            return
+        self._last_canvas_size = new_size
+        if self._resize_after is not None:
+            self.root.after_cancel(self._resize_after)
+        self._resize_after = self.root.after(120, self._do_canvas_resize_refresh)
+
+    def _do_canvas_resize_refresh(self):
+        """执行节流后的画布尺寸刷新"""
+        self._resize_after = None
         self.refresh_preview()
     
     def on_image_scale_change(self, *args):
@@ -1147,9 +1733,10 @@ class PhotoWatermarkApp:
         self.watermark_dragging = True
         self.drag_start_x = event.x
         self.drag_start_y = event.y
-        
+
         # 切换到自定义位置模式
         self.position.set('custom')
+        self._config_cache = None
     
     def on_watermark_drag_motion(self, event):
         """水印拖拽移动"""
@@ -1205,8 +1792,9 @@ class PhotoWatermarkApp:
                 new_y = max(0, min(new_y, img_height))
                 
                 self.custom_watermark_position = (new_x, new_y)
-            
-            # 刷新预览
+
+            # 刷新预览（自定义位置变化，配置缓存失效）
+            self._config_cache = None
             self.refresh_preview()
     
     def on_watermark_drag_end(self, event):
@@ -1215,7 +1803,9 @@ class PhotoWatermarkApp:
     
     def on_format_change(self):
         """输出格式改变"""
-        if self.output_format.get() == "JPEG":
+        output_format = self.output_format.get()
+        # 自动格式按图片逐张选择JPEG或PNG，两组设置都可能用到
+        if output_format in ("JPEG", "AUTO"):
             # 显示质量设置
             for widget in self.quality_frame.winfo_children():
                 widget.pack()
@@ -1223,6 +1813,14 @@ class PhotoWatermarkApp:
             # 隐藏质量设置
             for widget in self.quality_frame.winfo_children():
                 widget.pack_forget()
+        if output_format in ("PNG", "AUTO"):
+            # 显示PNG压缩设置
+            for widget in self.png_speed_frame.winfo_children():
+                widget.pack(side=tk.LEFT)
+        else:
+            # 隐藏PNG压缩设置
+            for widget in self.png_speed_frame.winfo_children():
+                widget.pack_forget()
     
     def on_quality_change(self, event=None):
         """质量变化"""
@@ -1461,7 +2059,7 @@ class PhotoWatermarkApp:
     
     def batch_export(self):
         """批量导出"""
-        images = self.image_processor.get_image_list()
+        images = self._images()
         if not images:
             messagebox.showerror("错误", "没有图片可导出")
             return
@@ -1476,180 +2074,210 @@ class PhotoWatermarkApp:
             if not messagebox.askyesno("警告", "输出文件夹与原图片文件夹相同，可能会覆盖原图。是否继续？"):
                 return
         
-        # 在新线程中执行导出
+        # 在主线程中读取配置和导出选项，任务参数可被序列化传给工作进程
+        config = self.get_current_config()
+        custom_position = (self.custom_watermark_position
+                           if self.position.get() == 'custom' else None)
+        export_opts = {
+            'output_folder': output_folder,
+            'naming_rule': self.naming_rule.get(),
+            'prefix': self.prefix.get(),
+            'suffix': self.suffix.get(),
+            'output_format': self.output_format.get(),
+            'quality': self.quality.get(),
+            'png_compress_level': PNG_COMPRESS_LEVELS.get(self.png_speed.get(), 6),
+            'resize_enabled': self.resize_enabled.get(),
+            'resize_method': self.resize_method.get(),
+            'resize_percentage': self.resize_percentage.get(),
+            'resize_width': self.resize_width.get(),
+            'resize_height': self.resize_height.get(),
+            'max_output_dim': self.max_output_dim.get(),
+        }
+
+        tasks = [
+            (image_info['file_path'], image_info['filename'],
+             config, custom_position, export_opts)
+            for image_info in images
+        ]
+
+        # 进度通过有界队列回传：工作线程每完成一张put一条，
+        # 主线程用单个after定时器20Hz批量排空，而不是每张图片都
+        # 往Tk事件队列里塞一个after(0)回调
+        progress_q = queue.Queue(maxsize=1000)
+        cancel_event = threading.Event()
+
+        # 在后台线程中驱动进程池：水印合成+编码是计算密集型工作，
+        # 进程池绕开GIL，多核并行处理各图片
         def export_thread():
             try:
-                # 获取水印配置
-                config = self.get_current_config()
-                watermark_type = config.get('type', 'text')
-                
-                # 批量应用水印并导出
                 results = {
                     'success_count': 0,
                     'failed_count': 0,
                     'failed_files': []
                 }
-                
-                for i, image_info in enumerate(images):
-                    try:
-                        # 应用水印（根据类型选择不同的管理器）
-                        watermarked = None
-                        
-                        if watermark_type == 'text':
-                            # 使用文本水印管理器
-                            if self.custom_watermark_position and self.position.get() == 'custom':
-                                watermarked = self.text_watermark_manager.preview_watermark_with_position(
-                                    image_info['image'],
-                                    config['text'],
-                                    config['font_family'],
-                                    config['font_size'],
-                                    config['font_color'],
-                                    config['opacity'],
-                                    config['rotation'],
-                                    config['shadow'],
-                                    config['outline'],
-                                    config['outline_color'],
-                                    config['outline_width'],
-                                    config['font_bold'],
-                                    config['font_italic'],
-                                    self.custom_watermark_position,
-                                    max_preview_size=(10000, 10000),  # 不限制尺寸
-                                    for_display=False  # 保持透明通道用于保存
-                                )
-                            else:
-                                watermarked = self.text_watermark_manager.preview_watermark(
-                                    image_info['image'],
-                                    config['text'],
-                                    config['font_family'],
-                                    config['font_size'],
-                                    config['font_color'],
-                                    config['opacity'],
-                                    config['position'],
-                                    config['rotation'],
-                                    config['shadow'],
-                                    config['outline'],
-                                    config['outline_color'],
-                                    config['outline_width'],
-                                    config['font_bold'],
-                                    config['font_italic'],
-                                    max_preview_size=(10000, 10000),  # 不限制尺寸
-                                    for_display=False  # 保持透明通道用于保存
-                                )
-                        elif watermark_type == 'image' and config['image_path']:
-                            # 使用图片水印管理器
-                            import cv2
-                            import numpy as np
-                            from PIL import Image
-                            
-                            if self.custom_watermark_position and self.position.get() == 'custom':
-                                result_cv = self.image_watermark_manager.apply_watermark(
-                                    image_info['image'],
-                                    config['image_path'],
-                                    config['image_scale'],
-                                    config['opacity'],
-                                    config['position'],
-                                    config['rotation'],
-                                    self.custom_watermark_position
-                                )
-                            else:
-                                result_cv = self.image_watermark_manager.apply_watermark(
-                                    image_info['image'],
-                                    config['image_path'],
-                                    config['image_scale'],
-                                    config['opacity'],
-                                    config['position'],
-                                    config['rotation']
-                                )
-                            
-                            if result_cv is not None:
-                                # 将OpenCV图片转换为PIL图片，保持透明通道
-                                if len(result_cv.shape) == 3 and result_cv.shape[2] == 4:
-                                    # 4通道BGRA -> RGBA
-                                    result_cv = cv2.cvtColor(result_cv, cv2.COLOR_BGRA2RGBA)
-                                else:
-                                    # 3通道BGR -> RGB
-                                    result_cv = cv2.cvtColor(result_cv, cv2.COLOR_BGR2RGB)
-                                watermarked = Image.fromarray(result_cv)
-                        
-                        if watermarked is None:
-                            watermarked = Image.open(image_info['image'])
-                        
-                        # 调整图片尺寸
-                        if self.resize_enabled.get():
-                            watermarked = self._resize_image(watermarked)
-                        
-                        # 生成输出文件名
-                        original_name = Path(image_info['file_path']).stem
-                        original_ext = Path(image_info['file_path']).suffix
-                        
-                        naming_rule = self.naming_rule.get()
-                        if naming_rule == 'prefix':
-                            new_name = f"{self.prefix.get()}{original_name}{original_ext}"
-                        elif naming_rule == 'suffix':
-                            new_name = f"{original_name}{self.suffix.get()}{original_ext}"
-                        else:
-                            new_name = f"{original_name}{original_ext}"
-                        
-                        # 确保输出格式扩展名正确
-                        if self.output_format.get() == 'JPEG' and not new_name.lower().endswith(('.jpg', '.jpeg')):
-                            new_name = f"{Path(new_name).stem}.jpg"
-                        elif self.output_format.get() == 'PNG' and not new_name.lower().endswith('.png'):
-                            new_name = f"{Path(new_name).stem}.png"
-                        
-                        output_file_path = Path(output_folder) / new_name
-                        
-                        # 保存图片
-                        if self.image_processor.save_image(watermarked, str(output_file_path), 
-                                                         self.output_format.get(), self.quality.get()):
+
+                max_workers = min(len(tasks), os.cpu_count() or 1)
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    done = 0
+                    for success, filename in executor.map(_export_one, tasks, chunksize=4):
+                        if success:
                             results['success_count'] += 1
                         else:
                             results['failed_count'] += 1
-                            results['failed_files'].append(image_info['filename'])
-                            
-                    except Exception as e:
-                        results['failed_count'] += 1
-                        results['failed_files'].append(image_info['filename'])
-                        print(f"导出图片失败: {image_info['filename']}, 错误: {e}")
-                
-                # 在主线程中显示结果
-                self.root.after(0, lambda: self.show_export_results(results))
-                
+                            results['failed_files'].append(filename)
+                        done += 1
+                        progress_q.put(('progress', done))
+                        if cancel_event.is_set():
+                            # 丢弃尚未开始的任务，已在运行的批次完成后返回
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            results['cancelled'] = True
+                            break
+
+                progress_q.put(('done', results))
+
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("导出失败", f"批量导出过程中发生错误: {e}"))
-        
+                progress_q.put(('error', e))
+
         # 显示进度对话框
         progress_window = tk.Toplevel(self.root)
         progress_window.title("导出进度")
-        progress_window.geometry("300x100")
+        progress_window.geometry("300x130")
         progress_window.resizable(False, False)
         progress_window.transient(self.root)
         progress_window.grab_set()
-        
+
         # 居中显示
         progress_window.geometry("+%d+%d" % (
             self.root.winfo_rootx() + 50,
             self.root.winfo_rooty() + 50
         ))
-        
-        ttk.Label(progress_window, text="正在导出图片，请稍候...").pack(pady=20)
-        
-        # 启动导出线程
-        export_thread = threading.Thread(target=export_thread)
-        export_thread.daemon = True
-        export_thread.start()
-        
-        # 延迟关闭进度窗口
+
+        total = len(tasks)
+        progress_label = ttk.Label(progress_window,
+                                   text=f"正在导出图片 (0/{total})...")
+        progress_label.pack(pady=(15, 5))
+        progress_bar = ttk.Progressbar(progress_window, maximum=total,
+                                       length=260, mode='determinate')
+        progress_bar.pack(pady=(0, 5))
+        ttk.Button(progress_window, text="取消",
+                   command=cancel_event.set).pack(pady=(0, 10))
+
         def close_progress():
             try:
                 progress_window.destroy()
             except:
                 pass
-        
-        progress_window.after(1000, close_progress)
+
+        def poll_progress():
+            finished = False
+            try:
+                while True:
+                    kind, payload = progress_q.get_nowait()
+                    if kind == 'progress':
+                        progress_bar['value'] = payload
+                        progress_label.config(
+                            text=f"正在导出图片 ({payload}/{total})...")
+                    elif kind == 'done':
+                        finished = True
+                        close_progress()
+                        self.show_export_results(payload)
+                    elif kind == 'error':
+                        finished = True
+                        close_progress()
+                        messagebox.showerror(
+                            "导出失败", f"批量导出过程中发生错误: {payload}")
+            except queue.Empty:
+                pass
+            if not finished:
+                self.root.after(50, poll_progress)
+
+        # 启动导出线程
+        export_thread = threading.Thread(target=export_thread)
+        export_thread.daemon = True
+        export_thread.start()
+
+        self.root.after(50, poll_progress)
     
+    def _is_noop_export(self, config, source_ext):
+        """
+        判断导出是否为无变化操作
+
+        无水印内容、未启用尺寸调整且输出格式与源格式一致时，
+        导出等价于复制原文件，可以跳过解码+重编码。
+
+        Args:
+            config: 当前水印配置
+            source_ext: 源文件扩展名（含点号）
+
+        Returns:
+            bool: 是否可以直接复制原文件
+        """
+        return _is_noop_export_config(config, source_ext,
+                                      self.resize_enabled.get(),
+                                      self.output_format.get())
+
+    def _composite_custom_text_watermark(self, current_image, config,
+                                         custom_position=None):
+        """
+        使用缓存的水印层合成自定义位置的文本水印（用于导出）
+
+        水印层只依赖图片尺寸、配置和位置，按 (图片尺寸, 配置哈希, 位置)
+        缓存，重复导出同尺寸图片时（例如调整质量设置后再次导出）无需
+        重新渲染水印。不能用id(current_image)做键：旧Image对象释放后
+        id会被复用，命中到尺寸不同的旧图层会在alpha_composite时报错。
+
+        Args:
+            current_image: 原始图片（PIL Image对象）
+            config: 当前水印配置
+
+        Returns:
+            PIL.Image: 带水印的RGBA图片
+        """
+        if custom_position is None:
+            custom_position = self.custom_watermark_position
+        cache_key = (current_image.size, hash(frozenset(config.items())),
+                     custom_position)
+
+        layer = self._wm_layer_cache.get(cache_key)
+        if layer is None:
+            # 渲染水印并放置到全尺寸透明图层上
+            watermark = self.text_watermark_manager.create_text_watermark(
+                config['text'],
+                config['font_family'],
+                config['font_size'],
+                config['font_color'],
+                config['opacity'],
+                config['rotation'],
+                config['shadow'],
+                config['outline'],
+                config['outline_color'],
+                config['outline_width'],
+                config['font_bold'],
+                config['font_italic']
+            )
+
+            layer = Image.new('RGBA', current_image.size, (0, 0, 0, 0))
+            x, y = custom_position
+            x = max(0, min(x, layer.width - watermark.width))
+            y = max(0, min(y, layer.height - watermark.height))
+            layer.paste(watermark, (x, y), watermark)
+
+            # LRU淘汰：超出容量时移除最久未使用的缓存项
+            if len(self._wm_layer_cache) >= self._wm_layer_cache_size:
+                self._wm_layer_cache.pop(next(iter(self._wm_layer_cache)))
+            self._wm_layer_cache[cache_key] = layer
+        else:
+            # 命中时移到末尾，保持LRU顺序
+            self._wm_layer_cache[cache_key] = self._wm_layer_cache.pop(cache_key)
+
+        if current_image.mode != 'RGBA':
+            current_image = current_image.convert('RGBA')
+        return Image.alpha_composite(current_image, layer)
+
     def show_export_results(self, results):
         """显示导出结果"""
-        message = f"导出完成！\n成功: {results['success_count']} 张\n失败: {results['failed_count']} 张"
+        header = "导出已取消" if results.get('cancelled') else "导出完成！"
+        message = f"{header}\n成功: {results['success_count']} 张\n失败: {results['failed_count']} 张"
         if results['failed_files']:
             message += f"\n\n失败的文件:\n" + "\n".join(results['failed_files'][:5])
             if len(results['failed_files']) > 5:
@@ -1672,9 +2300,8 @@ class PhotoWatermarkApp:
         # 检查是否导出到原文件夹
         current_info = self.image_processor.get_current_image_info()
         if current_info:
-            output_path = Path(output_folder).resolve()
-            image_path = Path(current_info['file_path']).parent.resolve()
-            if output_path == image_path:
+            image_folder = str(Path(current_info['file_path']).parent)
+            if self._paths_equal_fast(output_folder, image_folder):
                 if not messagebox.askyesno("警告", "输出文件夹与原图片文件夹相同，可能会覆盖原图。是否继续？"):
                     return
         
@@ -1682,31 +2309,44 @@ class PhotoWatermarkApp:
             # 获取水印配置
             config = self.get_current_config()
             watermark_type = config.get('type', 'text')
-            
+
+            # 生成输出文件名
+            current_info = self.image_processor.get_current_image_info()
+            original_ext = Path(current_info['file_path']).suffix
+            new_name = _make_export_name(
+                current_info['file_path'], self.naming_rule.get(),
+                self.prefix.get(), self.suffix.get(), self.output_format.get())
+            output_file_path = Path(output_folder) / new_name
+
+            # 无水印、无尺寸调整且格式不变时，直接复制原文件
+            # 跳过整个解码+重编码周期（同时避免JPEG质量损失）
+            max_dim = self.max_output_dim.get()
+            if not max_dim and self._is_noop_export(config, original_ext):
+                shutil.copyfile(current_info['file_path'], output_file_path)
+                messagebox.showinfo("成功", f"图片已导出到: {output_file_path}")
+                return
+
+            # 先缩小再加水印（最大输出边长），自定义位置按比例同步换算
+            custom_export_position = self.custom_watermark_position
+            if max_dim and max(current_image.size) > max_dim:
+                orig_width = current_image.width
+                current_image = current_image.copy()
+                current_image.thumbnail((max_dim, max_dim),
+                                        Image.Resampling.LANCZOS, reducing_gap=3.0)
+                if custom_export_position:
+                    ratio = current_image.width / orig_width
+                    custom_export_position = (int(custom_export_position[0] * ratio),
+                                              int(custom_export_position[1] * ratio))
+
             # 应用水印（根据类型选择不同的管理器）
             watermarked = None
-            
+
             if watermark_type == 'text':
                 # 使用文本水印管理器
-                if self.custom_watermark_position and self.position.get() == 'custom':
-                    watermarked = self.text_watermark_manager.preview_watermark_with_position(
-                        current_image,
-                        config['text'],
-                        config['font_family'],
-                        config['font_size'],
-                        config['font_color'],
-                        config['opacity'],
-                        config['rotation'],
-                        config['shadow'],
-                        config['outline'],
-                        config['outline_color'],
-                        config['outline_width'],
-                        config['font_bold'],
-                        config['font_italic'],
-                        self.custom_watermark_position,
-                        max_preview_size=(10000, 10000),  # 不限制尺寸
-                        for_display=False  # 保持透明通道用于保存
-                    )
+                if custom_export_position and self.position.get() == 'custom':
+                    # 使用缓存的水印层，避免重复渲染
+                    watermarked = self._composite_custom_text_watermark(
+                        current_image, config, custom_export_position)
                 else:
                     watermarked = self.text_watermark_manager.preview_watermark(
                         current_image,
@@ -1732,7 +2372,7 @@ class PhotoWatermarkApp:
                 import numpy as np
                 from PIL import Image
                 
-                if self.custom_watermark_position and self.position.get() == 'custom':
+                if custom_export_position and self.position.get() == 'custom':
                     result_cv = self.image_watermark_manager.apply_watermark(
                         current_image,
                         config['image_path'],
@@ -1740,7 +2380,7 @@ class PhotoWatermarkApp:
                         config['opacity'],
                         config['position'],
                         config['rotation'],
-                        self.custom_watermark_position
+                        custom_export_position
                     )
                 else:
                     result_cv = self.image_watermark_manager.apply_watermark(
@@ -1764,35 +2404,30 @@ class PhotoWatermarkApp:
             
             if watermarked is None:
                 watermarked = Image.open(current_image)
-            
+
+            # JPEG输出且结果全不透明时尽早转RGB，减少后续缩放和编码的数据量
+            if (self.output_format.get() == 'JPEG' and watermarked.mode == 'RGBA'
+                    and watermarked.getextrema()[3][0] == 255):
+                watermarked = watermarked.convert('RGB')
+
             # 调整图片尺寸
             if self.resize_enabled.get():
                 watermarked = self._resize_image(watermarked)
-            
-            # 生成输出文件名
-            current_info = self.image_processor.get_current_image_info()
-            original_name = Path(current_info['file_path']).stem
-            original_ext = Path(current_info['file_path']).suffix
-            
-            naming_rule = self.naming_rule.get()
-            if naming_rule == 'prefix':
-                new_name = f"{self.prefix.get()}{original_name}{original_ext}"
-            elif naming_rule == 'suffix':
-                new_name = f"{original_name}{self.suffix.get()}{original_ext}"
-            else:
-                new_name = f"{original_name}{original_ext}"
-            
-            # 确保输出格式扩展名正确
-            if self.output_format.get() == 'JPEG' and not new_name.lower().endswith(('.jpg', '.jpeg')):
-                new_name = f"{Path(new_name).stem}.jpg"
-            elif self.output_format.get() == 'PNG' and not new_name.lower().endswith('.png'):
-                new_name = f"{Path(new_name).stem}.png"
-            
-            output_file_path = Path(output_folder) / new_name
-            
+
+            # 自动格式：按结果是否含透明像素决定JPEG/PNG，并重算扩展名
+            output_format = self.output_format.get()
+            if output_format == 'AUTO':
+                output_format = _pick_auto_format(watermarked)
+                new_name = _make_export_name(
+                    current_info['file_path'], self.naming_rule.get(),
+                    self.prefix.get(), self.suffix.get(), output_format)
+                output_file_path = Path(output_folder) / new_name
+
             # 保存图片
-            if self.image_processor.save_image(watermarked, str(output_file_path), 
-                                             self.output_format.get(), self.quality.get()):
+            if self.image_processor.save_image(
+                    watermarked, str(output_file_path),
+                    output_format, self.quality.get(),
+                    png_compress_level=PNG_COMPRESS_LEVELS.get(self.png_speed.get(), 6)):
                 messagebox.showinfo("成功", f"图片已导出到: {output_file_path}")
             else:
                 messagebox.showerror("错误", "导出图片失败")
@@ -1809,18 +2444,28 @@ class PhotoWatermarkApp:
             self.on_watermark_change()
             messagebox.showinfo("成功", "设置已重置")
     
+    @staticmethod
+    def _paths_equal_fast(a, b):
+        """
+        比较两个路径是否指向同一文件夹
+
+        先做纯字符串比较（normcase + abspath，无系统调用），
+        不相等时再回退到resolve()处理符号链接等情况。
+        """
+        if os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b)):
+            return True
+        try:
+            return Path(a).resolve() == Path(b).resolve()
+        except OSError:
+            return False
+
     def _is_same_folder(self, output_folder):
         """检查输出文件夹是否与原图片文件夹相同"""
-        images = self.image_processor.get_image_list()
-        if not images:
+        # 父目录集合由ImageProcessor缓存，只需解析输出路径一次
+        resolved_parents = self.image_processor.get_resolved_parents()
+        if not resolved_parents:
             return False
-        
-        output_path = Path(output_folder).resolve()
-        for image_info in images:
-            image_path = Path(image_info['file_path']).parent.resolve()
-            if output_path == image_path:
-                return True
-        return False
+        return Path(output_folder).resolve() in resolved_parents
     
     def _resize_image(self, image):
         """调整图片尺寸"""
@@ -1836,8 +2481,8 @@ class PhotoWatermarkApp:
             new_size = (self.resize_width.get(), self.resize_height.get())
         else:
             return image
-        
-        return image.resize(new_size, Image.Resampling.LANCZOS)
+
+        return _resize_with_kernel(image, new_size)
     
     def on_closing(self):
         """窗口关闭事件"""
@@ -3,13 +3,85 @@
 使用PIL处理文本水印的创建、渲染和位置控制
 """
 
+import io
+import json
 import math
+import mmap
 import os
 import platform
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from typing import Tuple, Optional, List
 from PIL import Image, ImageDraw, ImageFont
 from pathlib import Path
 
+# OpenCV用于大尺寸水印的SIMD加速旋转，不可用时回退PIL
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+
+@lru_cache(maxsize=256)
+def _hex_to_rgba(hex_color: str, opacity: int) -> Tuple[int, int, int, int]:
+    """
+    将十六进制颜色转换为RGBA（纯函数，结果缓存）
+
+    一次int()解析整串再按位拆出通道，比逐通道切片+转换少一半字节码；
+    alpha用整数运算避免经过float。
+
+    Args:
+        hex_color: 十六进制颜色字符串
+        opacity: 透明度 (0-100)
+
+    Returns:
+        tuple: (R, G, B, A)
+    """
+    v = int(hex_color.lstrip('#'), 16)
+    return (v >> 16 & 0xFF, v >> 8 & 0xFF, v & 0xFF, (opacity * 255) // 100)
+
+
+# 批量加水印子进程的进程级缓存：水印在父进程只渲染一次，
+# 每个子进程收到PNG字节后也只解码一次
+_worker_watermark: Optional[Image.Image] = None
+_worker_manager: Optional["TextWatermarkManager"] = None
+
+
+def _batch_apply_worker(args):
+    """
+    批量加水印的子进程工作函数（必须置于模块级才能被pickle）
+
+    Args:
+        args: (图片路径, 输出路径, 水印PNG字节, 位置, 自定义坐标)
+
+    Returns:
+        tuple: (图片路径, 是否成功)
+    """
+    global _worker_watermark, _worker_manager
+    image_path, output_path, wm_bytes, position, custom_position = args
+    try:
+        if _worker_manager is None:
+            _worker_manager = TextWatermarkManager()
+        if _worker_watermark is None:
+            _worker_watermark = Image.open(io.BytesIO(wm_bytes)).convert('RGBA')
+
+        with Image.open(image_path) as img:
+            img.load()
+
+        result = _worker_manager.apply_watermark(
+            img, _worker_watermark, position, custom_position, inplace=True)
+
+        # JPEG不支持透明通道
+        if result.mode == 'RGBA' and output_path.lower().endswith(('.jpg', '.jpeg')):
+            result = result.convert('RGB')
+        result.save(output_path)
+        return (image_path, True)
+    except Exception as e:
+        print(f"批量加水印失败 {image_path}: {e}")
+        return (image_path, False)
+
 
 class TextWatermarkManager:
     """文本水印管理器（基于PIL）"""
@@ -26,53 +98,255 @@ class TextWatermarkManager:
         'bottom_center': (0.5, 0.95),
         'bottom_right': (0.95, 0.95)
     }
-    
+
+    # 整数百分比形式：calculate_position用纯整数运算，省去浮点乘法
+    # 和int()截断（批量导出时每张图都要算一次）
+    _POSITIONS_PCT = {
+        name: (int(rx * 100), int(ry * 100))
+        for name, (rx, ry) in POSITIONS.items()
+    }
+
+    # Windows常用字体路径映射（包括粗体、斜体变体）
+    WINDOWS_FONTS = {
+        '微软雅黑': {'regular': 'msyh.ttc', 'bold': 'msyhbd.ttc'},
+        'Microsoft YaHei': {'regular': 'msyh.ttc', 'bold': 'msyhbd.ttc'},
+        '宋体': {'regular': 'simsun.ttc', 'bold': 'simsun.ttc'},
+        'SimSun': {'regular': 'simsun.ttc', 'bold': 'simsun.ttc'},
+        '黑体': {'regular': 'simhei.ttf', 'bold': 'simhei.ttf'},
+        'SimHei': {'regular': 'simhei.ttf', 'bold': 'simhei.ttf'},
+        '楷体': {'regular': 'simkai.ttf', 'bold': 'simkai.ttf'},
+        'KaiTi': {'regular': 'simkai.ttf', 'bold': 'simkai.ttf'},
+        'Arial': {'regular': 'arial.ttf', 'bold': 'arialbd.ttf', 'italic': 'ariali.ttf', 'bold_italic': 'arialbi.ttf'},
+        'Times New Roman': {'regular': 'times.ttf', 'bold': 'timesbd.ttf', 'italic': 'timesi.ttf', 'bold_italic': 'timesbi.ttf'},
+        'Courier New': {'regular': 'cour.ttf', 'bold': 'courbd.ttf', 'italic': 'couri.ttf', 'bold_italic': 'courbi.ttf'},
+        'Verdana': {'regular': 'verdana.ttf', 'bold': 'verdanab.ttf', 'italic': 'verdanai.ttf', 'bold_italic': 'verdanaz.ttf'},
+    }
+
+    # (bold, italic) -> 字体变体名，免去每次创建水印时的if/elif判断
+    _VARIANT_LOOKUP = {
+        (False, False): 'regular',
+        (True, False): 'bold',
+        (False, True): 'italic',
+        (True, True): 'bold_italic',
+    }
+
+    # 字体对象缓存容量（按LRU淘汰）
+    _FONT_OBJ_CACHE_SIZE = 64
+
+    # 渲染结果缓存容量：同一组样式参数只光栅化一次
+    _WATERMARK_CACHE_SIZE = 16
+
     def __init__(self):
         """初始化文本水印管理器"""
         self._font_file_cache = None
+        # 已加载的字体对象缓存：ImageFont.truetype每次都要打开并解析
+        # 字体文件，按(路径, 字号)缓存后预览和批量导出只解析一次
+        self._font_obj_cache: "OrderedDict[Tuple[str, int], ImageFont.FreeTypeFont]" = OrderedDict()
+        # 已解析的字体路径缓存：(字体名, 变体) -> 路径或None，
+        # 负结果也缓存，避免每次预览都重复走整套搜索+回退逻辑
+        self._resolved_path_cache: dict = {}
+        # 渲染好的水印图缓存：样式参数 -> Image，拖动位置或切换图片时
+        # 样式不变，无需重新测量和光栅化文本
+        self._watermark_cache: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        # 文本边界框缓存：(文本, 字体路径, 字号) -> bbox。调色/调透明度
+        # 时文本和字体不变，命中后连测量用的临时图都不用建
+        self._bbox_cache: dict = {}
+        # 字体文件字节缓存：同一字体文件（msyh.ttc约20MB）在多个字号
+        # 下共用一份缓冲，磁盘只读一次
+        self._font_bytes_cache: dict = {}
+
+    def _load_font(self, font_path: str, font_size: int) -> Optional[ImageFont.FreeTypeFont]:
+        """
+        加载TrueType字体（按路径+字号缓存）
+
+        Args:
+            font_path: 字体文件路径或字体名称
+            font_size: 字号
+
+        Returns:
+            ImageFont.FreeTypeFont: 字体对象，加载失败返回None
+        """
+        key = (font_path, font_size)
+        font = self._font_obj_cache.get(key)
+        if font is not None:
+            self._font_obj_cache.move_to_end(key)
+            return font
+
+        try:
+            if os.path.isfile(font_path):
+                # 字体文件字节只读一次（mmap整块映射），换字号时
+                # 从共享缓冲重建字体对象，不再碰磁盘
+                data = self._font_bytes_cache.get(font_path)
+                if data is None:
+                    with open(font_path, 'rb') as f:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            data = bytes(mm)
+                    self._font_bytes_cache[font_path] = data
+                font = ImageFont.truetype(io.BytesIO(data), font_size)
+            else:
+                # 非文件路径（按字体名加载）交给Pillow自己解析
+                font = ImageFont.truetype(font_path, font_size)
+        except (OSError, IOError, ValueError):
+            return None
+
+        if len(self._font_obj_cache) >= self._FONT_OBJ_CACHE_SIZE:
+            self._font_obj_cache.popitem(last=False)
+        self._font_obj_cache[key] = font
+        return font
+
+    def _resolve_font_path(self, font_family: str, font_variant: str,
+                           font_size: int) -> Optional[str]:
+        """
+        解析字体名称对应的字体文件路径（结果缓存，含负结果）
+
+        候选路径用_load_font验证可加载性，验证过的字体对象直接进入
+        字体对象缓存，不会重复解析。
+
+        Args:
+            font_family: 字体名称
+            font_variant: 变体 ('regular'/'bold'/'italic'/'bold_italic')
+            font_size: 用于验证加载的字号
+
+        Returns:
+            str: 字体文件路径，所有回退都失败时返回None
+        """
+        key = (font_family, font_variant)
+        if key in self._resolved_path_cache:
+            return self._resolved_path_cache[key]
+
+        font_path = None
+
+        if platform.system() == 'Windows':
+            fonts_dir = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts')
+            # 目录前缀只规范化一次，循环里用字符串拼接代替os.path.join
+            # （join每次都要做类型检查和分隔符处理）
+            fonts_prefix = fonts_dir.rstrip('\\/') + os.sep
+
+            # 建立字体文件索引（首次调用时）
+            if self._font_file_cache is None:
+                self._build_font_cache(fonts_dir)
+
+            # 按优先级拼出一份候选路径列表，单次遍历、首个能加载的
+            # 即采用：预定义映射 -> 文件索引的名称变体 -> 默认回退字体
+            candidates = []
+
+            if font_family in self.WINDOWS_FONTS:
+                font_info = self.WINDOWS_FONTS[font_family]
+                font_file = font_info.get(font_variant) or font_info.get('regular')
+                candidates.append(fonts_prefix + font_file)
+
+            if self._font_file_cache:
+                family_lower = font_family.lower()
+                for search_name in (family_lower,
+                                    family_lower.replace(' ', ''),
+                                    family_lower.replace(' ', '-'),
+                                    family_lower.replace(' ', '_')):
+                    cached = self._font_file_cache.get(search_name)
+                    if cached is not None:
+                        candidates.append(cached)
+
+            for default_font in ('msyh.ttc', 'simsun.ttc', 'simhei.ttf', 'arial.ttf'):
+                candidates.append(fonts_prefix + default_font)
+
+            for candidate in candidates:
+                if self._load_font(candidate, font_size) is not None:
+                    font_path = candidate
+                    break
+        else:
+            # 非Windows系统，尝试按名称直接加载
+            if self._load_font(font_family, font_size) is not None:
+                font_path = font_family
+
+        self._resolved_path_cache[key] = font_path
+        return font_path
     
+    # 字体索引持久化位置（与配置文件同目录）
+    _FONT_INDEX_FILE = os.path.join('config', 'font_index.json')
+
     def _build_font_cache(self, fonts_dir: str) -> None:
         """
         构建字体文件缓存
-        
+
+        索引会持久化到config/font_index.json，以字体目录的mtime作为
+        有效性标记：目录没变时下次启动直接加载JSON，免去整个目录扫描。
+
         Args:
             fonts_dir: 字体目录路径
         """
         if self._font_file_cache is not None:
             return
-        
+
         self._font_file_cache = {}
-        
+
+        try:
+            stamp = os.stat(fonts_dir).st_mtime_ns
+        except OSError:
+            stamp = None
+
+        # 先尝试磁盘索引
+        if stamp is not None:
+            try:
+                with open(self._FONT_INDEX_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('stamp') == stamp:
+                    self._font_file_cache = data.get('map', {})
+                    return
+            except (OSError, ValueError):
+                pass
+
         try:
-            for font_file in os.listdir(fonts_dir):
-                if font_file.lower().endswith(('.ttf', '.ttc', '.otf')):
-                    font_path = os.path.join(fonts_dir, font_file)
+            # scandir流式遍历目录项，不像listdir先分配整张文件名列表；
+            # Windows的Fonts目录常有500+文件，流式+键去重能明显减少分配。
+            # 目录前缀在循环外拼好，循环内用字符串连接代替os.path.join
+            fonts_prefix = fonts_dir.rstrip('\\/') + os.sep
+            with os.scandir(fonts_dir) as it:
+                for entry in it:
+                    font_file = entry.name
+                    if not font_file.lower().endswith(('.ttf', '.ttc', '.otf')):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    font_path = fonts_prefix + font_file
                     # 去掉扩展名和变体后缀
                     base_name = font_file.rsplit('.', 1)[0].lower()
-                    
-                    # 添加多种可能的键
-                    self._font_file_cache[base_name] = font_path
-                    self._font_file_cache[base_name.replace('-', '')] = font_path
-                    self._font_file_cache[base_name.replace('_', '')] = font_path
-                    self._font_file_cache[base_name.replace(' ', '')] = font_path
+
+                    # 添加多种可能的键（集合去重，普通命名下四个键大多相同）
+                    keys = {
+                        base_name,
+                        base_name.replace('-', ''),
+                        base_name.replace('_', ''),
+                        base_name.replace(' ', ''),
+                    }
+                    self._font_file_cache.update(dict.fromkeys(keys, font_path))
         except Exception as e:
             print(f"构建字体缓存时出错: {e}")
+            return
+
+        # 写回磁盘供下次启动使用（临时文件+os.replace原子替换）
+        if stamp is not None and self._font_file_cache:
+            try:
+                os.makedirs(os.path.dirname(self._FONT_INDEX_FILE), exist_ok=True)
+                tmp_path = self._FONT_INDEX_FILE + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'stamp': stamp, 'map': self._font_file_cache},
+                              f, ensure_ascii=False)
+                os.replace(tmp_path, self._FONT_INDEX_FILE)
+            except OSError as e:
+                print(f"写入字体索引失败: {e}")
     
-    def _hex_to_rgba(self, hex_color: str, opacity: int) -> Tuple[int, int, int, int]:
+    @staticmethod
+    def _hex_to_rgba(hex_color: str, opacity: int) -> Tuple[int, int, int, int]:
         """
-        将十六进制颜色转换为RGBA
-        
+        将十六进制颜色转换为RGBA（转发到模块级缓存函数）
+
         Args:
             hex_color: 十六进制颜色字符串
             opacity: 透明度 (0-100)
-            
+
         Returns:
             tuple: (R, G, B, A)
         """
-        hex_color = hex_color.lstrip('#')
-        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        a = int(255 * opacity / 100)
-        return (r, g, b, a)
+        return _hex_to_rgba(hex_color, opacity)
     
     def _create_default_watermark(self, text: str, font_size: int, 
                                   color: str, opacity: int) -> Image.Image:
@@ -89,9 +363,7 @@ class TextWatermarkManager:
             PIL.Image: 默认水印图片
         """
         font = ImageFont.load_default()
-        temp_img = Image.new('RGBA', (1, 1), (0, 0, 0, 0))
-        temp_draw = ImageDraw.Draw(temp_img)
-        bbox = temp_draw.textbbox((0, 0), text, font=font)
+        bbox = font.getbbox(text)
         
         width = bbox[2] - bbox[0] + 20
         height = bbox[3] - bbox[1] + 20
@@ -128,120 +400,60 @@ class TextWatermarkManager:
         Returns:
             PIL.Image: 文本水印图片
         """
+        # 同一组样式参数只渲染一次：仅改位置或切换图片时直接复用。
+        # 调用方不会原地修改水印图，因此可以直接返回缓存对象
+        cache_key = (text, font_family, font_size, color, opacity, rotation,
+                     shadow, outline, outline_color, outline_width, bold, italic)
+        cached = self._watermark_cache.get(cache_key)
+        if cached is not None:
+            self._watermark_cache.move_to_end(cache_key)
+            return cached
+
         try:
-            font = None
-            
-            # Windows常用字体路径映射（包括粗体、斜体变体）
-            windows_fonts = {
-                '微软雅黑': {'regular': 'msyh.ttc', 'bold': 'msyhbd.ttc'},
-                'Microsoft YaHei': {'regular': 'msyh.ttc', 'bold': 'msyhbd.ttc'},
-                '宋体': {'regular': 'simsun.ttc', 'bold': 'simsun.ttc'},
-                'SimSun': {'regular': 'simsun.ttc', 'bold': 'simsun.ttc'},
-                '黑体': {'regular': 'simhei.ttf', 'bold': 'simhei.ttf'},
-                'SimHei': {'regular': 'simhei.ttf', 'bold': 'simhei.ttf'},
-                '楷体': {'regular': 'simkai.ttf', 'bold': 'simkai.ttf'},
-                'KaiTi': {'regular': 'simkai.ttf', 'bold': 'simkai.ttf'},
-                'Arial': {'regular': 'arial.ttf', 'bold': 'arialbd.ttf', 'italic': 'ariali.ttf', 'bold_italic': 'arialbi.ttf'},
-                'Times New Roman': {'regular': 'times.ttf', 'bold': 'timesbd.ttf', 'italic': 'timesi.ttf', 'bold_italic': 'timesbi.ttf'},
-                'Courier New': {'regular': 'cour.ttf', 'bold': 'courbd.ttf', 'italic': 'couri.ttf', 'bold_italic': 'courbi.ttf'},
-                'Verdana': {'regular': 'verdana.ttf', 'bold': 'verdanab.ttf', 'italic': 'verdanai.ttf', 'bold_italic': 'verdanaz.ttf'},
-            }
-            
             # 确定要使用的字体变体
-            font_variant = 'regular'
-            if bold and italic:
-                font_variant = 'bold_italic'
-            elif bold:
-                font_variant = 'bold'
-            elif italic:
-                font_variant = 'italic'
-            
-            # Windows字体目录
-            if platform.system() == 'Windows':
-                fonts_dir = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts')
-                
-                # 建立字体文件索引（首次调用时）
-                if self._font_file_cache is None:
-                    self._build_font_cache(fonts_dir)
-                
-                # 1. 尝试从预定义映射加载
-                if font_family in windows_fonts:
-                    font_info = windows_fonts[font_family]
-                    font_file = font_info.get(font_variant) or font_info.get('regular')
-                    font_path = os.path.join(fonts_dir, font_file)
-                    try:
-                        font = ImageFont.truetype(font_path, font_size)
-                    except (OSError, IOError):
-                        pass
-                
-                # 2. 从缓存中搜索
-                if font is None and self._font_file_cache:
-                    search_names = [
-                        font_family.lower(),
-                        font_family.lower().replace(' ', ''),
-                        font_family.lower().replace(' ', '-'),
-                        font_family.lower().replace(' ', '_'),
-                    ]
-                    
-                    for search_name in search_names:
-                        if search_name in self._font_file_cache:
-                            font_path = self._font_file_cache[search_name]
-                            try:
-                                font = ImageFont.truetype(font_path, font_size)
-                                break
-                            except (OSError, IOError):
-                                continue
-                
-                # 3. 如果还没成功，使用默认字体
-                if font is None:
-                    for default_font in ['msyh.ttc', 'simsun.ttc', 'simhei.ttf', 'arial.ttf']:
-                        try:
-                            font = ImageFont.truetype(os.path.join(fonts_dir, default_font), font_size)
-                            break
-                        except (OSError, IOError):
-                            continue
-            else:
-                # 非Windows系统，尝试直接加载
-                try:
-                    font = ImageFont.truetype(font_family, font_size)
-                except (OSError, IOError):
-                    pass
-            
+            font_variant = self._VARIANT_LOOKUP[(bold, italic)]
+
+            # 解析字体路径并加载（两级缓存：路径解析 + 字体对象）
+            font = None
+            font_path = self._resolve_font_path(font_family, font_variant, font_size)
+            if font_path is not None:
+                font = self._load_font(font_path, font_size)
+
             # 如果所有方法都失败，使用默认字体
             if font is None:
                 font = ImageFont.load_default()
-            
+
             # 记录是否需要模拟粗体/斜体（用于中文字体）
             need_simulate_bold = bold
             need_simulate_italic = italic
-            
+
             # 如果成功加载了带bold/italic的字体变体，则不需要模拟
             if font_variant != 'regular' and font is not None:
                 # 检查是否真的加载了变体字体文件
-                if platform.system() == 'Windows' and font_family in windows_fonts:
-                    font_info = windows_fonts[font_family]
+                if platform.system() == 'Windows' and font_family in self.WINDOWS_FONTS:
+                    font_info = self.WINDOWS_FONTS[font_family]
                     if font_variant in font_info:
                         need_simulate_bold = False
                         need_simulate_italic = False
             
-            # 创建临时图片来测量文本尺寸
-            temp_img = Image.new('RGBA', (1, 1), (0, 0, 0, 0))
-            temp_draw = ImageDraw.Draw(temp_img)
-            
-            # 获取文本边界框
-            bbox = temp_draw.textbbox((0, 0), text, font=font)
+            # 获取文本边界框（按文本+字体+字号缓存，FreeType整形
+            # 只需做一次；调整颜色/透明度/位置时键不变）
+            bbox_key = (text, font_path, font_size)
+            bbox = self._bbox_cache.get(bbox_key)
+            if bbox is None:
+                # font.getbbox与textbbox((0,0))同值，但无需任何
+                # 测量画布和Draw对象
+                bbox = font.getbbox(text)
+                self._bbox_cache[bbox_key] = bbox
             text_width = bbox[2] - bbox[0]
             text_height = bbox[3] - bbox[1]
             
-            # 添加边距和阴影/描边空间
+            # 添加边距和阴影/描边空间。旋转不需要额外边距：所有旋转
+            # 路径都会自行扩展画布，预留10%只是白白放大光栅化面积
             base_margin = max(font_size // 20, 8)
             extra_margin = outline_width + 3 if (shadow or outline) else 0
             margin = base_margin + extra_margin
-            
-            # 考虑旋转后的额外空间
-            rotation_margin = int(max(text_width, text_height) * 0.1) if rotation != 0 else 0
-            margin = margin + rotation_margin
-            
+
             img_width = text_width + margin * 2
             img_height = text_height + margin * 2
             
@@ -253,52 +465,151 @@ class TextWatermarkManager:
             text_x = margin
             text_y = margin
             
-            # 添加阴影
+            # 描边和模拟粗体都用Pillow原生的stroke_width一次光栅化完成
+            # （旧实现对(2w+1)²邻域逐次重绘文本，描边宽度5时要画81遍；
+            # 模拟粗体也要画9遍），整个文本最多只进FreeType两次：
+            # 阴影一次、主文本一次
+            text_color_rgba = self._hex_to_rgba(color, opacity)
+            stroke_width = 0
+            stroke_fill = None
+            if outline and outline_width > 0:
+                stroke_width = outline_width
+                stroke_fill = self._hex_to_rgba(outline_color, opacity)
+                if need_simulate_bold:
+                    # 粗体文本的描边相应加宽1px
+                    stroke_width += 1
+            elif need_simulate_bold:
+                # 模拟粗体：1px同色描边等效于3×3偏移重绘
+                stroke_width = 1
+                stroke_fill = text_color_rgba
+
+            # 添加阴影：带同宽同色描边，使阴影轮廓与描边后的字形一致
             if shadow:
                 shadow_offset = 2
-                shadow_color = (0, 0, 0, int(255 * opacity / 100 * 0.5))
-                draw.text((text_x + shadow_offset, text_y + shadow_offset), 
-                         text, font=font, fill=shadow_color)
-            
-            # 添加描边
-            if outline and outline_width > 0:
-                outline_color_rgba = self._hex_to_rgba(outline_color, opacity)
-                for dx in range(-outline_width, outline_width + 1):
-                    for dy in range(-outline_width, outline_width + 1):
-                        if dx*dx + dy*dy <= outline_width*outline_width:
-                            draw.text((text_x + dx, text_y + dy), text, font=font, fill=outline_color_rgba)
-            
-            # 绘制主文本
-            text_color_rgba = self._hex_to_rgba(color, opacity)
+                shadow_color = (0, 0, 0, (opacity * 255) // 200)
+                draw.text((text_x + shadow_offset, text_y + shadow_offset),
+                          text, font=font, fill=shadow_color,
+                          stroke_width=stroke_width,
+                          stroke_fill=shadow_color if stroke_width else None)
+
+            draw.text((text_x, text_y), text, font=font, fill=text_color_rgba,
+                      stroke_width=stroke_width, stroke_fill=stroke_fill)
             
-            # 如果需要模拟粗体（用于中文字体）
-            if need_simulate_bold:
-                for offset_x in [-1, 0, 1]:
-                    for offset_y in [-1, 0, 1]:
-                        draw.text((text_x + offset_x, text_y + offset_y), text, font=font, fill=text_color_rgba)
+            # 斜体剪切和任意角度旋转可以合成一个仿射矩阵，整个画布
+            # 只重采样一次；90度整数倍旋转是零成本转置，不参与合并
+            if need_simulate_italic and rotation % 360 not in (0, 90, 180, 270):
+                watermark = self._shear_rotate(watermark, rotation)
             else:
-                draw.text((text_x, text_y), text, font=font, fill=text_color_rgba)
-            
-            # 应用斜体效果（使用仿射变换）
-            if need_simulate_italic:
-                watermark = watermark.transform(
-                    watermark.size,
-                    Image.AFFINE,
-                    (1, 0.3, 0, 0, 1, 0),
-                    resample=Image.Resampling.BICUBIC
-                )
-            
-            # 旋转水印
-            if rotation != 0:
-                watermark = watermark.rotate(rotation, expand=True, fillcolor=(0, 0, 0, 0))
-            
+                # 应用斜体效果（使用仿射变换）
+                if need_simulate_italic:
+                    watermark = watermark.transform(
+                        watermark.size,
+                        Image.AFFINE,
+                        (1, 0.3, 0, 0, 1, 0),
+                        resample=Image.Resampling.BICUBIC
+                    )
+
+                # 旋转水印
+                if rotation != 0:
+                    watermark = self._rotate_expand(watermark, rotation)
+
+            if len(self._watermark_cache) >= self._WATERMARK_CACHE_SIZE:
+                self._watermark_cache.popitem(last=False)
+            self._watermark_cache[cache_key] = watermark
+
             return watermark
             
         except Exception as e:
             print(f"创建文本水印失败: {e}")
             return self._create_default_watermark(text, font_size, color, opacity)
     
-    def calculate_position(self, image_size: Tuple[int, int], 
+    @staticmethod
+    def _shear_rotate(watermark: Image.Image, rotation: float) -> Image.Image:
+        """
+        斜体剪切与旋转合成为单次仿射变换
+
+        两次BICUBIC重采样（先剪切再旋转）合并成一次，像素流量减半。
+
+        Args:
+            watermark: RGBA水印图
+            rotation: 旋转角度（逆时针，度）
+
+        Returns:
+            PIL.Image: 剪切并旋转后的水印图
+        """
+        w, h = watermark.size
+        rad = math.radians(rotation)
+        cos_a, sin_a = math.cos(rad), math.sin(rad)
+        new_w = int(math.ceil(w * abs(cos_a) + h * abs(sin_a)))
+        new_h = int(math.ceil(w * abs(sin_a) + h * abs(cos_a)))
+
+        # transform接收输出->输入的逆映射。先套旋转的逆映射（绕各自
+        # 画布中心；图像y轴向下，正弦取负才对应逆时针），再叠加
+        # 剪切的逆映射 in = (x' + 0.3*y', y')
+        a, b = cos_a, -sin_a
+        d, e = sin_a, cos_a
+        c = w / 2 - a * (new_w / 2) - b * (new_h / 2)
+        f = h / 2 - d * (new_w / 2) - e * (new_h / 2)
+        data = (a + 0.3 * d, b + 0.3 * e, c + 0.3 * f, d, e, f)
+
+        return watermark.transform(
+            (new_w, new_h), Image.AFFINE, data,
+            resample=Image.Resampling.BICUBIC,
+            fillcolor=(0, 0, 0, 0)
+        )
+
+    @staticmethod
+    def _rotate_expand(watermark: Image.Image, rotation: float) -> Image.Image:
+        """
+        旋转水印并扩展画布
+
+        大尺寸水印走OpenCV的warpAffine（SIMD向量化插值），
+        小水印或OpenCV不可用时用PIL的rotate。
+
+        Args:
+            watermark: RGBA水印图
+            rotation: 旋转角度（逆时针，度）
+
+        Returns:
+            PIL.Image: 旋转后的水印图
+        """
+        # 90度整数倍旋转是纯内存转置，无插值成本且完全无损
+        cardinal = rotation % 360
+        if cardinal == 90:
+            return watermark.transpose(Image.Transpose.ROTATE_90)
+        if cardinal == 180:
+            return watermark.transpose(Image.Transpose.ROTATE_180)
+        if cardinal == 270:
+            return watermark.transpose(Image.Transpose.ROTATE_270)
+
+        if cv2 is not None and max(watermark.size) > 256:
+            try:
+                arr = np.asarray(watermark)
+                w, h = watermark.size
+                rad = math.radians(rotation)
+                cos_a, sin_a = abs(math.cos(rad)), abs(math.sin(rad))
+                new_w = int(math.ceil(w * cos_a + h * sin_a))
+                new_h = int(math.ceil(w * sin_a + h * cos_a))
+                # getRotationMatrix2D与PIL.rotate同为逆时针；平移项把
+                # 旋转中心挪到扩展后画布的中心
+                matrix = cv2.getRotationMatrix2D((w / 2, h / 2), rotation, 1.0)
+                matrix[0, 2] += new_w / 2 - w / 2
+                matrix[1, 2] += new_h / 2 - h / 2
+                out = cv2.warpAffine(
+                    arr, matrix, (new_w, new_h),
+                    flags=cv2.INTER_CUBIC,
+                    borderMode=cv2.BORDER_CONSTANT,
+                    borderValue=(0, 0, 0, 0)
+                )
+                return Image.fromarray(out)
+            except Exception as e:
+                print(f"OpenCV旋转失败，回退PIL: {e}")
+
+        return watermark.rotate(rotation, expand=True,
+                                resample=Image.Resampling.BICUBIC,
+                                fillcolor=(0, 0, 0, 0))
+
+    def calculate_position(self, image_size: Tuple[int, int],
                           watermark_size: Tuple[int, int],
                           position: str) -> Tuple[int, int]:
         """
@@ -314,15 +625,14 @@ class TextWatermarkManager:
         """
         img_w, img_h = image_size
         wm_w, wm_h = watermark_size
-        
-        if position not in self.POSITIONS:
-            position = 'bottom_right'
-        
-        ratio_x, ratio_y = self.POSITIONS[position]
-        
-        # 计算位置
-        x = int((img_w - wm_w) * ratio_x)
-        y = int((img_h - wm_h) * ratio_y)
+
+        pct = self._POSITIONS_PCT.get(position)
+        if pct is None:
+            pct = self._POSITIONS_PCT['bottom_right']
+
+        # 计算位置（整数百分比运算）
+        x = (img_w - wm_w) * pct[0] // 100
+        y = (img_h - wm_h) * pct[1] // 100
         
         # 确保水印在图片边界内
         x = max(0, min(x, img_w - wm_w))
@@ -330,41 +640,68 @@ class TextWatermarkManager:
         
         return x, y
     
-    def apply_watermark(self, image: Image.Image, watermark: Image.Image, 
-                       position: str, custom_position: Optional[Tuple[int, int]] = None) -> Image.Image:
+    def apply_watermark(self, image: Image.Image, watermark: Image.Image,
+                       position: str, custom_position: Optional[Tuple[int, int]] = None,
+                       inplace: bool = False, preserve_alpha: bool = True) -> Image.Image:
         """
         将水印应用到图片上
-        
+
         Args:
             image: 原始图片
             watermark: 水印图片
             position: 位置名称或'custom'
             custom_position: 自定义位置坐标 (x, y)
-            
+            inplace: 是否允许直接在image上合成（调用方持有临时图时
+                     可省去一次全尺寸拷贝）
+            preserve_alpha: 是否保证输出带透明通道。False且底图是RGB时
+                            直接在RGB上合成，省掉RGBA来回两次全图转换
+
         Returns:
             PIL.Image: 带水印的图片
         """
         try:
-            # 创建图片副本
-            result = image.copy()
-            
-            # 确保图片有透明通道
-            if result.mode != 'RGBA':
-                result = result.convert('RGBA')
+            # 输出无需透明通道且底图本就是RGB时，保持RGB直接合成
+            flatten_rgb = (not preserve_alpha and image.mode == 'RGB'
+                           and watermark.mode == 'RGBA')
+
+            if flatten_rgb:
+                result = image if inplace else image.copy()
+            elif image.mode != 'RGBA':
+                # convert本身就会产生新图，无需再copy
+                result = image.convert('RGBA')
+            elif inplace:
+                result = image
+            else:
+                result = image.copy()
             
-            # 计算水印位置
+            # 计算水印位置。calculate_position自带边界夹取，
+            # 只有自定义坐标需要在这里夹进图片范围
             if position == 'custom' and custom_position:
                 x, y = custom_position
+                max_x = result.width - watermark.width
+                max_y = result.height - watermark.height
+                if x > max_x:
+                    x = max_x
+                if x < 0:
+                    x = 0
+                if y > max_y:
+                    y = max_y
+                if y < 0:
+                    y = 0
             else:
                 x, y = self.calculate_position(result.size, watermark.size, position)
             
-            # 确保水印在图片范围内
-            x = max(0, min(x, result.width - watermark.width))
-            y = max(0, min(y, result.height - watermark.height))
-            
-            # 将水印合成到图片上
-            if watermark.mode == 'RGBA':
-                result.paste(watermark, (x, y), watermark)
+            # 将水印合成到图片上：alpha_composite原地只混合水印覆盖的
+            # 矩形区域（paste带mask会把水印自身的alpha写进结果，让不透明
+            # 底图在水印处出现半透明洞；整图alpha_composite则要多分配
+            # 一个全尺寸缓冲）
+            if flatten_rgb:
+                # 3通道paste+单通道mask：RGB底图不透明，混合结果
+                # 与先转RGBA合成再压白一致
+                result.paste(watermark.convert('RGB'), (x, y),
+                             mask=watermark.getchannel('A'))
+            elif watermark.mode == 'RGBA':
+                result.alpha_composite(watermark, (x, y))
             else:
                 result.paste(watermark, (x, y))
             
@@ -415,18 +752,36 @@ class TextWatermarkManager:
             else:
                 print(f"不支持的图片输入类型: {type(image_input)}")
                 return None
-            
+
+            # 先缩放到预览尺寸再加水印：合成和RGBA转换都在小图上进行，
+            # 像素量通常只有原图的1/50~1/100（水印尺寸随scale等比缩小，
+            # 视觉效果与"先加水印后缩放"一致）
+            max_w, max_h = max_preview_size
+            scale = min(max_w / image.width, max_h / image.height, 1.0)
+            if scale < 1.0:
+                # reducing_gap先用BOX整数倍预缩，再LANCZOS精缩到目标，
+                # 大倍率缩小时比单次重采样快数倍且质量更好
+                image = image.resize(
+                    (max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                    Image.Resampling.LANCZOS, reducing_gap=2.0
+                )
+                font_size = max(1, int(round(font_size * scale)))
+                outline_width = max(1, int(round(outline_width * scale)))
+
             # 创建文本水印
             watermark = self.create_text_watermark(
                 text, font_family, font_size, color, opacity,
                 rotation, shadow, outline, outline_color, outline_width,
                 bold, italic
             )
-            
-            # 应用水印
-            result = self.apply_watermark(image, watermark, position)
-            
-            # 调整预览图大小
+
+            # 应用水印：自己打开或刚缩放出来的图是临时的，允许原地合成；
+            # 仅用于显示时无需保留透明通道，RGB底图可直接合成
+            owns_image = isinstance(image_input, str) or scale < 1.0
+            result = self.apply_watermark(image, watermark, position,
+                                          inplace=owns_image,
+                                          preserve_alpha=not for_display)
+
             # 只有在用于显示时才转换为RGB（用于Tkinter显示）
             # 用于保存时保持RGBA以保留透明通道
             if for_display and result.mode == 'RGBA':
@@ -434,22 +789,13 @@ class TextWatermarkManager:
                 background = Image.new('RGB', result.size, (255, 255, 255))
                 background.paste(result, mask=result.split()[-1])
                 result = background
-            
-            w, h = result.size
-            max_w, max_h = max_preview_size
-            
-            if w > max_w or h > max_h:
-                scale = min(max_w / w, max_h / h)
-                new_w = int(w * scale)
-                new_h = int(h * scale)
-                result = result.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            
+
             return result
-            
+
         except Exception as e:
             print(f"生成预览图时出错: {e}")
             return None
-    
+
     def preview_watermark_with_position(self, image_input, text: str,
                                        font_family: str, font_size: int,
                                        color: str, opacity: int,
@@ -494,18 +840,38 @@ class TextWatermarkManager:
             else:
                 print(f"不支持的图片输入类型: {type(image_input)}")
                 return None
-            
+
+            # 先缩放到预览尺寸再加水印（同preview_watermark），
+            # 自定义坐标按同一比例换算到小图坐标系
+            max_w, max_h = max_preview_size
+            scale = min(max_w / image.width, max_h / image.height, 1.0)
+            if scale < 1.0:
+                # reducing_gap先用BOX整数倍预缩，再LANCZOS精缩到目标，
+                # 大倍率缩小时比单次重采样快数倍且质量更好
+                image = image.resize(
+                    (max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                    Image.Resampling.LANCZOS, reducing_gap=2.0
+                )
+                font_size = max(1, int(round(font_size * scale)))
+                outline_width = max(1, int(round(outline_width * scale)))
+                if custom_position:
+                    custom_position = (int(custom_position[0] * scale),
+                                       int(custom_position[1] * scale))
+
             # 创建文本水印
             watermark = self.create_text_watermark(
                 text, font_family, font_size, color, opacity,
                 rotation, shadow, outline, outline_color, outline_width,
                 bold, italic
             )
-            
-            # 应用水印
-            result = self.apply_watermark(image, watermark, 'custom', custom_position)
-            
-            # 调整预览图大小
+
+            # 应用水印：自己打开或刚缩放出来的图是临时的，允许原地合成；
+            # 仅用于显示时无需保留透明通道，RGB底图可直接合成
+            owns_image = isinstance(image_input, str) or scale < 1.0
+            result = self.apply_watermark(image, watermark, 'custom', custom_position,
+                                          inplace=owns_image,
+                                          preserve_alpha=not for_display)
+
             # 只有在用于显示时才转换为RGB（用于Tkinter显示）
             # 用于保存时保持RGBA以保留透明通道
             if for_display and result.mode == 'RGBA':
@@ -513,22 +879,82 @@ class TextWatermarkManager:
                 background = Image.new('RGB', result.size, (255, 255, 255))
                 background.paste(result, mask=result.split()[-1])
                 result = background
-            
-            w, h = result.size
-            max_w, max_h = max_preview_size
-            
-            if w > max_w or h > max_h:
-                scale = min(max_w / w, max_h / h)
-                new_w = int(w * scale)
-                new_h = int(h * scale)
-                result = result.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            
+
             return result
             
         except Exception as e:
             print(f"生成预览图时出错: {e}")
             return None
     
+    def batch_apply(self, image_paths: List[str], output_dir: str,
+                    text: str, font_family: str, font_size: int,
+                    color: str, opacity: int, position: str = 'bottom_right',
+                    rotation: float = 0, shadow: bool = False,
+                    outline: bool = False, outline_color: str = '#000000',
+                    outline_width: int = 2, bold: bool = False,
+                    italic: bool = False,
+                    custom_position: Optional[Tuple[int, int]] = None,
+                    max_workers: Optional[int] = None) -> dict:
+        """
+        多进程批量给图片加文本水印
+
+        水印只在父进程渲染一次，以PNG字节分发给子进程，
+        子进程无需加载字体。加水印和保存按CPU核数并行。
+
+        Args:
+            image_paths: 图片路径列表
+            output_dir: 输出目录（以原文件名保存）
+            text: 水印文本
+            font_family: 字体名称
+            font_size: 字体大小
+            color: 字体颜色
+            opacity: 透明度 (0-100)
+            position: 位置名称或'custom'
+            rotation: 旋转角度
+            shadow: 是否添加阴影
+            outline: 是否添加描边
+            outline_color: 描边颜色
+            outline_width: 描边宽度
+            bold: 是否粗体
+            italic: 是否斜体
+            custom_position: 自定义位置坐标 (x, y)
+            max_workers: 进程数，默认CPU核数
+
+        Returns:
+            dict: {'success': [文件名], 'failed': [文件名]}
+        """
+        results = {'success': [], 'failed': []}
+
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+
+            # 父进程渲染一次水印，序列化成PNG字节分发
+            watermark = self.create_text_watermark(
+                text, font_family, font_size, color, opacity,
+                rotation, shadow, outline, outline_color, outline_width,
+                bold, italic
+            )
+            buf = io.BytesIO()
+            watermark.save(buf, 'PNG', compress_level=1)
+            wm_bytes = buf.getvalue()
+
+            tasks = [
+                (path, os.path.join(output_dir, os.path.basename(path)),
+                 wm_bytes, position, custom_position)
+                for path in image_paths
+            ]
+
+            with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+                for path, ok in executor.map(_batch_apply_worker, tasks, chunksize=8):
+                    if ok:
+                        results['success'].append(os.path.basename(path))
+                    else:
+                        results['failed'].append(os.path.basename(path))
+        except Exception as e:
+            print(f"批量加水印出错: {e}")
+
+        return results
+
     @staticmethod
     def get_available_fonts() -> List[str]:
         """